@@ -0,0 +1,209 @@
+"""Re-derive stored columns from the raw feeds after the extraction rules change.
+
+    python backfill.py
+    python backfill.py --column annualSalaryAvg --batch-size 50000
+    python backfill.py --glob 's0*.json' --no-mongodb
+
+Raw fields are read from the feed files in batches into a DataFrame, the
+salary, city, zipcode and date rules run column-wise over each batch (see
+jobs_project/vectorized.py), and every batch is written back with one
+set-based UPDATE in PostgreSQL and one unordered bulk_write in MongoDB. Only
+rows whose values actually change are touched, so their updatedAt moves and
+the next incremental export picks up exactly the corrected jobs. Jobs without
+a req_id have random IDs that cannot be matched and are skipped.
+"""
+import argparse
+import glob
+import io
+import itertools
+import logging
+import os
+import time
+
+import pymongo
+from pymongo import UpdateOne
+
+from infra.postgresql_connector import PostgresConnector
+from infra.redis_connector import RedisConnector
+from jobs_project import settings
+from jobs_project.streaming import iter_json_array
+from jobs_project.vectorized import EXTRACTORS, extract_ids, raw_frame
+
+# Staging column types for the columns the backfill can rewrite
+STAGING_TYPES = {
+    'annualSalaryAvg': 'DECIMAL(12,2)',
+    'city': 'VARCHAR(100)',
+    'zipcode': 'VARCHAR(10)',
+    'correctDate': 'TIMESTAMP',
+}
+
+logger = logging.getLogger('backfill')
+
+class Backfiller:
+    def __init__(self, columns, postgres=True, mongodb=True, redis=True):
+        self.columns = columns
+        self.connector = None
+        self.mongo_client = None
+        self.collection = None
+        self.redis_client = None
+        self.counts = {'jobs': 0, 'skipped': 0, 'postgres': 0, 'mongodb': 0}
+
+        if postgres:
+            postgres_settings = settings.POSTGRES_SETTINGS
+            self.connector = PostgresConnector(
+                dbname=postgres_settings['database'],
+                user=postgres_settings['user'],
+                password=postgres_settings['password'],
+                host=postgres_settings['host'],
+                port=postgres_settings['port'],
+                max_retries=postgres_settings.get('connect_retries', 5)
+            )
+        if mongodb:
+            mongo_settings = settings.MONGODB_SETTINGS
+            self.mongo_client = pymongo.MongoClient(
+                host=mongo_settings['host'],
+                port=mongo_settings['port'],
+                username=mongo_settings['username'],
+                password=mongo_settings['password']
+            )
+            self.collection = self.mongo_client[mongo_settings['database']]['jobs']
+        if redis:
+            redis_settings = settings.REDIS_SETTINGS
+            self.key_prefix = redis_settings.get('key_prefix', 'job:')
+            self.redis_client = RedisConnector(
+                host=redis_settings['host'],
+                port=redis_settings['port'],
+                db=redis_settings['db']
+            ).get_client()
+
+    def derive(self, jobs, filename):
+        """A frame of _id plus the re-derived columns for one batch of raw jobs"""
+        raw = raw_frame(jobs, filename)
+        frame = raw[[]].assign(_id=extract_ids(raw))
+        for column in self.columns:
+            frame[column] = EXTRACTORS[column](raw)
+
+        matched = frame['_id'].notna()
+        self.counts['jobs'] += len(frame)
+        self.counts['skipped'] += int((~matched).sum())
+        # A feed can list a job twice; like the pipelines, the last one wins
+        return frame[matched].drop_duplicates('_id', keep='last')
+
+    def update_postgres(self, frame):
+        """COPY the batch into a staging table and apply it with one UPDATE ... FROM"""
+        data = io.StringIO()
+        # COPY reads empty unquoted fields back as NULL
+        frame.to_csv(data, index=False, header=False, na_rep='')
+        data.seek(0)
+
+        columns = ', '.join(self.columns)
+        definitions = ', '.join(f"{column} {STAGING_TYPES[column]}" for column in self.columns)
+        assignments = ', '.join(f"{column} = s.{column}" for column in self.columns)
+        changed = ' OR '.join(f"jobs.{column} IS DISTINCT FROM s.{column}" for column in self.columns)
+
+        conn = self.connector.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    CREATE TEMP TABLE IF NOT EXISTS jobs_backfill
+                    (_id UUID, {definitions}) ON COMMIT DELETE ROWS
+                """)
+                cur.copy_expert(f"COPY jobs_backfill (_id, {columns}) FROM STDIN WITH (FORMAT csv)", data)
+                cur.execute(f"""
+                    UPDATE jobs SET {assignments}, updatedAt = now()
+                    FROM jobs_backfill s
+                    WHERE jobs._id = s._id AND ({changed})
+                """)
+                updated = cur.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.connector.return_connection(conn)
+        self.counts['postgres'] += updated
+
+    def update_mongodb(self, frame):
+        """Send the batch as one unordered bulk_write of updates that skip unchanged documents"""
+        operations = []
+        for record in frame.to_dict('records'):
+            job_id = record.pop('_id')
+            if record.get('zipcode') is not None:
+                # MongoDBPipeline stores zipcodes as integers
+                record['zipcode'] = int(record['zipcode'])
+            operations.append(UpdateOne(
+                {'_id': job_id, '$or': [{column: {'$ne': value}} for column, value in record.items()]},
+                {'$set': record, '$currentDate': {'updatedAt': True}}
+            ))
+        if operations:
+            result = self.collection.bulk_write(operations, ordered=False)
+            self.counts['mongodb'] += result.modified_count
+
+    def invalidate_cache(self, frame):
+        # Cached copies of the old values would otherwise be served until they expire
+        keys = [f"{self.key_prefix}{job_id}" for job_id in frame['_id']]
+        if keys:
+            self.redis_client.delete(*keys)
+
+    def backfill_file(self, file_path, batch_size):
+        filename = os.path.basename(file_path)
+        jobs = iter_json_array(file_path, 'jobs')
+        for batch in iter(lambda: list(itertools.islice(jobs, batch_size)), []):
+            frame = self.derive(batch, filename)
+            if frame.empty:
+                continue
+            # Missing values become None for the database drivers
+            frame = frame.astype(object).where(frame.notna(), None)
+            if self.connector:
+                self.update_postgres(frame)
+            if self.collection is not None:
+                self.update_mongodb(frame)
+            if self.redis_client:
+                self.invalidate_cache(frame)
+            logger.info(f"{filename}: {self.counts['jobs']} jobs re-derived so far")
+
+    def close(self):
+        if self.connector:
+            self.connector.close_all()
+        if self.mongo_client:
+            self.mongo_client.close()
+        if self.redis_client:
+            self.redis_client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-derive stored job columns from the raw feeds')
+    parser.add_argument('--input-dir', default=settings.JSON_INPUT_DIR)
+    parser.add_argument('--glob', default=settings.JSON_INPUT_GLOB)
+    parser.add_argument('--column', action='append', choices=list(EXTRACTORS),
+                        help='Only rewrite this column (repeatable, default: all)')
+    parser.add_argument('--batch-size', type=int, default=20000, help='Jobs per batch and per set-based update')
+    parser.add_argument('--no-postgres', action='store_true')
+    parser.add_argument('--no-mongodb', action='store_true')
+    parser.add_argument('--no-redis', action='store_true', help='Leave cached jobs to expire instead of deleting them')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=settings.LOG_FORMAT, datefmt=settings.LOG_DATEFORMAT)
+
+    files = sorted(glob.glob(os.path.join(args.input_dir, args.glob)))
+    backfiller = Backfiller(
+        args.column or list(EXTRACTORS),
+        postgres=not args.no_postgres,
+        mongodb=not args.no_mongodb,
+        redis=not args.no_redis
+    )
+    started_at = time.monotonic()
+    try:
+        for file_path in files:
+            backfiller.backfill_file(file_path, args.batch_size)
+    finally:
+        backfiller.close()
+
+    counts = backfiller.counts
+    logger.info(
+        f"Re-derived {counts['jobs']} jobs from {len(files)} files in {time.monotonic() - started_at:.1f}s: "
+        f"{counts['postgres']} PostgreSQL rows and {counts['mongodb']} MongoDB documents changed, "
+        f"{counts['skipped']} jobs without a req_id skipped"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Generate synthetic job feeds shaped like data/s01.json.
+
+    python benchmarks/generate_feed.py --jobs 100000 --output /tmp/feed_100k.json
+    python benchmarks/generate_feed.py --jobs 10000000 --description-words 400 \
+        --salary-mix range=0.2,single=0.3,fields=0.1,dollar=0.1,none=0.3 --output /tmp/feed_10m.json
+
+Jobs are written one at a time, so feeds far larger than memory can be generated.
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+CITIES = [
+    ('Memphis', 'Tennessee', '38118'), ('Hutchins', 'Texas', '75141'), ('PHOENIX', 'AZ', '85043'),
+    ('Sioux Falls', 'South Dakota', '57104'), ('north las vegas', 'Nevada', '89030'),
+    ('Saint Louis', 'Missouri', '63101'), ('MCALLEN', 'Texas', '78501'), ('South Holland', 'Illinois', '60473'),
+    ('Roissy-en-France', 'Ile-de-France', '95700'), ('St. Paul', 'Minnesota', '55101'),
+    ('Birmingham', 'Alabama', '35209'), ('Marietta', 'Georgia', '30060'), ('Edison', 'New Jersey', '08817'),
+    ('Toronto', 'Ontario', 'M5V 2T6'), ('Charlotte', 'North Carolina', '28202-1234'),
+]
+
+SOURCES = [
+    ('fedexground-prod-kenexa', 'FedEx Ground'), ('fedex-prod-workday', 'FedEx Express'),
+    ('autozone-prod-taleo', None), ('fedexgenco-prod-taleo', 'FedEx Supply Chain'),
+]
+
+WORDS = (
+    "responsible movement trailers unload load doors yard packages lifting pushing pulling "
+    "carrying safe efficient manner essential functions performs switches defined hooking "
+    "parked trailer communicates management central control coordinate documents inspections "
+    "equipment understands demonstrates procedures customers store team schedule benefits"
+).split()
+
+def salary_text(kind, rng):
+    low = rng.uniform(14, 30)
+    high = low + rng.uniform(0.5, 6)
+    if kind == 'range':
+        return rng.choice([
+            f"Pay: ${low:.2f} - ${high:.2f} per hour.",
+            f"Starting at ${low:.0f} to ${high:.0f}/hr depending on experience.",
+            f"${low:.2f} per hour to ${high:.2f} per hour.",
+        ])
+    if kind == 'single':
+        return rng.choice([f"Earn ${low:.2f}/hr.", f"Wage: ${low:.2f} an hour.", f"${low:.0f} per hour"])
+    if kind == 'dollar':
+        # A dollar sign without a usable amount exercises the miss path
+        return "Eligible for a $ sign-on bonus."
+    return ''
+
+def parse_mix(mix):
+    kinds, weights = [], []
+    for part in mix.split(','):
+        kind, weight = part.split('=')
+        kinds.append(kind.strip())
+        weights.append(float(weight))
+    return kinds, weights
+
+def generate_job(index, rng, description_words, kinds, weights):
+    city, state, postal_code = rng.choice(CITIES)
+    ats_code, organization = rng.choice(SOURCES)
+    kind = rng.choices(kinds, weights)[0]
+
+    words = rng.choices(WORDS, k=description_words)
+    words.insert(rng.randrange(len(words) + 1), salary_text(kind, rng))
+    created = datetime(2024, 2, 2, tzinfo=timezone.utc) - timedelta(minutes=rng.randrange(525600))
+    low = round(rng.uniform(14, 30), 2)
+
+    data = {
+        'slug': f"bench-{index}",
+        'req_id': f"BENCH{index:09d}",
+        'title': 'Package Handler',
+        'description': ' '.join(words),
+        'city': city,
+        'state': state,
+        'country_code': 'US',
+        'postal_code': postal_code,
+        'latitude': round(rng.uniform(25, 48), 7),
+        'longitude': round(rng.uniform(-123, -70), 7),
+        'brand': organization or 'AutoZone-US',
+        'salary_currency': 'USD',
+        'salary_value': 0,
+        'salary_min_value': low if kind == 'fields' else 0,
+        'salary_max_value': round(low + 2, 2) if kind == 'fields' else 0,
+        'employment_type': 'FULL_TIME',
+        'source': ats_code.split('-')[0],
+        'apply_url': f"https://example.com/apply/{index}",
+        'ats_code': ats_code,
+        'meta_data': {'canonical_url': f"https://careers.example.com/jobs/{index}"},
+        'update_date': created.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'create_date': created.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'full_location': f"{city}, {state}",
+        'short_location': f"{city}, {state}",
+    }
+    if organization:
+        data['hiring_organization'] = organization
+    return {'data': data}
+
+def write_feed(path, jobs, description_words=300, salary_mix='range=0.3,single=0.3,fields=0.1,dollar=0.05,none=0.25', seed=0):
+    rng = random.Random(seed)
+    kinds, weights = parse_mix(salary_mix)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"jobs": [\n')
+        for index in range(jobs):
+            if index:
+                f.write(',\n')
+            f.write(json.dumps(generate_job(index, rng, description_words, kinds, weights)))
+        f.write(f'\n], "totalCount": {jobs}, "count": {jobs}}}\n')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic job feed')
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--description-words', type=int, default=300)
+    parser.add_argument('--salary-mix', default='range=0.3,single=0.3,fields=0.1,dollar=0.05,none=0.25',
+                        help='Comma-separated kind=weight pairs: range, single, fields, dollar, none')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    write_feed(args.output, args.jobs, args.description_words, args.salary_mix, args.seed)
+    print(f"Wrote {args.jobs} jobs to {args.output}")
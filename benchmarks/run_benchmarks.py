@@ -0,0 +1,197 @@
+"""Benchmark extraction and storage throughput on synthetic feeds.
+
+    python benchmarks/run_benchmarks.py --jobs 10000 --jobs 100000
+    python benchmarks/run_benchmarks.py --feed /tmp/feed_10m.json --only parse_stream
+    python benchmarks/run_benchmarks.py --jobs 10000 --storage postgres,redis,mongodb
+
+Every result is appended as one JSON line to --output, tagged with the git commit,
+so runs can be compared across commits.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scrapy.http import TextResponse
+from jobs_project import settings
+from jobs_project.pipelines import MongoDBPipeline, PostgresPipeline, RedisDedupPipeline, RedisPipeline
+from jobs_project.spiders.json_spider import JsonSpider
+from jobs_project.streaming import iter_json_array
+from jobs_project.vectorized import EXTRACTORS as COLUMN_EXTRACTORS, raw_frame
+from generate_feed import write_feed
+
+# extract_* methods benchmarked in isolation, with how to build their arguments
+EXTRACTORS = {
+    'extract_date': lambda job_raw, filename: (job_raw,),
+    'extract_company': lambda job_raw, filename: (job_raw['data'],),
+    'extract_salary': lambda job_raw, filename: (job_raw['data'],),
+    'extract_job_key': lambda job_raw, filename: (job_raw['data'],),
+    'extract_job_url': lambda job_raw, filename: (job_raw['data'],),
+    'extract_city': lambda job_raw, filename: (job_raw['data'],),
+    'extract_zipcode': lambda job_raw, filename: (job_raw['data'],),
+    'extract_source': lambda job_raw, filename: (job_raw['data'], filename),
+    'extract_id': lambda job_raw, filename: (job_raw['data'], filename),
+}
+
+STORAGE_PIPELINES = {
+    'dedup': lambda: RedisDedupPipeline({
+        **settings.REDIS_SETTINGS,
+        # A fresh prefix per run so the dedup stage never drops benchmark items
+        'fingerprint_prefix': f"bench-fingerprint:{time.time_ns()}:",
+        'fingerprint_ttl': 3600
+    }),
+    'postgres': lambda: PostgresPipeline(settings.POSTGRES_SETTINGS),
+    'redis': lambda: RedisPipeline(settings.REDIS_SETTINGS),
+    'mongodb': lambda: MongoDBPipeline(settings.MONGODB_SETTINGS),
+}
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def timed_run(func, repeat):
+    """Best wall time over ``repeat`` runs and the item count of the last run"""
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        count = func()
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+def run_parse_benchmarks(spider, feed_path, repeat, selected):
+    filename = os.path.basename(feed_path)
+
+    def parse():
+        with open(feed_path, 'rb') as f:
+            response = TextResponse(url=f"file://{feed_path}", body=f.read(), encoding='utf-8')
+        return sum(1 for _ in spider.parse(response, filename))
+
+    def parse_stream():
+        return sum(1 for _ in spider.parse_stream(None, filename, feed_path))
+
+    for name, func in (('parse', parse), ('parse_stream', parse_stream)):
+        if selected(name):
+            yield name, timed_run(func, repeat)
+
+def run_extractor_benchmarks(spider, jobs, filename, repeat, selected):
+    for name, build_args in EXTRACTORS.items():
+        if not selected(name):
+            continue
+        method = getattr(spider, name)
+        arguments = [build_args(job_raw, filename) for job_raw in jobs]
+
+        def run():
+            for args in arguments:
+                method(*args)
+            return len(arguments)
+
+        yield name, timed_run(run, repeat)
+
+def run_vectorized_benchmark(jobs, filename, repeat, selected):
+    """The column-wise extractors backfill.py runs, including building the raw frame"""
+    def run():
+        frame = raw_frame(jobs, filename)
+        for extract in COLUMN_EXTRACTORS.values():
+            extract(frame)
+        return len(frame)
+
+    if selected('vectorized_extract'):
+        yield 'vectorized_extract', timed_run(run, repeat)
+
+def run_storage_benchmark(spider, jobs, filename, names):
+    items = [item for item in spider.parse_jobs(jobs, filename)]
+    pipelines = [STORAGE_PIPELINES[name]() for name in names]
+
+    started_at = time.perf_counter()
+    for pipeline in pipelines:
+        pipeline.open_spider(spider)
+    for item in items:
+        for pipeline in pipelines:
+            item = pipeline.process_item(item, spider)
+    for pipeline in pipelines:
+        if hasattr(pipeline, 'close_spider'):
+            pipeline.close_spider(spider)
+    return time.perf_counter() - started_at, len(items)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JsonSpider extraction and storage pipelines')
+    parser.add_argument('--jobs', type=int, action='append',
+                        help='Generate a synthetic feed of this many jobs (repeatable, default: 10000)')
+    parser.add_argument('--feed', action='append', help='Benchmark an existing feed file instead (repeatable)')
+    parser.add_argument('--description-words', type=int, default=300)
+    parser.add_argument('--salary-mix', default='range=0.3,single=0.3,fields=0.1,dollar=0.05,none=0.25')
+    parser.add_argument('--sample', type=int, default=100000,
+                        help='Jobs loaded into memory for the extract_* and storage benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the best time is kept')
+    parser.add_argument('--only', action='append', help='Only run these benchmarks (repeatable)')
+    parser.add_argument('--storage', default='',
+                        help='Comma-separated pipelines for the end-to-end run: dedup, postgres, redis, mongodb')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results.jsonl'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    spider = JsonSpider()
+    commit = git_commit()
+
+    feeds = [(path, None) for path in args.feed or []]
+    tmp_dir = tempfile.TemporaryDirectory()
+    for jobs in args.jobs or ([] if feeds else [10000]):
+        path = os.path.join(tmp_dir.name, f"feed_{jobs}.json")
+        write_feed(path, jobs, args.description_words, args.salary_mix)
+        feeds.append((path, jobs))
+
+    def selected(name):
+        return not args.only or name in args.only
+
+    # The in-memory sample is only loaded when a benchmark that uses it will run
+    needs_sample = bool(args.storage) or any(selected(name) for name in [*EXTRACTORS, 'vectorized_extract'])
+
+    with open(args.output, 'a') as output, tmp_dir:
+        for feed_path, jobs in feeds:
+            filename = os.path.basename(feed_path)
+            sample = list(itertools.islice(iter_json_array(feed_path, 'jobs'), args.sample)) if needs_sample else []
+            results = []
+
+            for name, (seconds, count) in run_parse_benchmarks(spider, feed_path, args.repeat, selected):
+                results.append((name, seconds, count))
+            for name, (seconds, count) in run_extractor_benchmarks(spider, sample, filename, args.repeat, selected):
+                results.append((name, seconds, count))
+            for name, (seconds, count) in run_vectorized_benchmark(sample, filename, args.repeat, selected):
+                results.append((name, seconds, count))
+            if args.storage:
+                seconds, count = run_storage_benchmark(spider, sample, filename, args.storage.split(','))
+                results.append((f"storage:{args.storage}", seconds, count))
+
+            for name, seconds, count in results:
+                record = {
+                    'benchmark': name,
+                    'items': count,
+                    'seconds': round(seconds, 6),
+                    'items_per_sec': round(count / seconds, 1) if seconds else None,
+                    'feed': filename if jobs is None else f"synthetic:{jobs}",
+                    'description_words': None if jobs is None else args.description_words,
+                    'salary_mix': None if jobs is None else args.salary_mix,
+                    'commit': commit,
+                    'python': platform.python_version(),
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                }
+                output.write(json.dumps(record) + '\n')
+                print(f"{record['feed']:>20} {name:<28} {count:>10} items {seconds:>10.4f}s {record['items_per_sec']:>12}/s")
+
+if __name__ == "__main__":
+    main()
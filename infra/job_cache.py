@@ -0,0 +1,110 @@
+import json
+import threading
+import uuid
+from infra.job_store import job_id as derive_job_id
+
+# Same shape RedisPipeline caches: camelCase keys, string _id and correctDate, float salary
+LOOKUP_QUERY = """
+    SELECT
+        _id::text AS _id,
+        companyName AS "companyName",
+        to_char(correctDate, 'YYYY-MM-DD HH24:MI:SS') AS "correctDate",
+        jobKey AS "jobKey",
+        source,
+        jobPageUrl AS "jobPageUrl",
+        annualSalaryAvg::float8 AS "annualSalaryAvg",
+        city,
+        zipcode
+    FROM jobs
+    WHERE _id = ANY(%s::uuid[])
+"""
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+class JobCache:
+    """Cache-aside lookups of jobs by _id over the job:{_id} keys RedisPipeline writes.
+
+    Batched lookups read Redis with chunked MGETs, fetch every miss from
+    PostgreSQL in one query and write the found jobs back through a single
+    Redis pipeline. Safe to share between threads.
+    """
+    def __init__(self, redis_connector, postgres_connector=None, ttl=3600, key_prefix='job:', chunk_size=500):
+        self.redis_client = redis_connector.get_client()
+        self.postgres_connector = postgres_connector
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'db_hits': 0, 'db_misses': 0}
+
+    def get(self, job_id):
+        return self.get_many([job_id]).get(job_id)
+
+    def get_by_key(self, source, job_key):
+        """Look a job up by its source and jobKey, which its _id is derived from"""
+        return self.get(derive_job_id(source, job_key))
+
+    def get_many(self, job_ids):
+        """Return a dict of _id to job for every id found in Redis or PostgreSQL"""
+        job_ids = list(dict.fromkeys(job_ids))
+        jobs = {}
+        missing = []
+        for start in range(0, len(job_ids), self.chunk_size):
+            chunk = job_ids[start:start + self.chunk_size]
+            values = self.redis_client.mget([f"{self.key_prefix}{job_id}" for job_id in chunk])
+            for job_id, value in zip(chunk, values):
+                if value is None:
+                    missing.append(job_id)
+                else:
+                    jobs[job_id] = json.loads(value)
+
+        found = self._load(missing) if missing else {}
+        if found:
+            self.populate(found.values())
+        jobs.update(found)
+
+        with self.lock:
+            self.counters['hits'] += len(job_ids) - len(missing)
+            self.counters['misses'] += len(missing)
+            self.counters['db_hits'] += len(found)
+            self.counters['db_misses'] += len(missing) - len(found)
+        return jobs
+
+    def _load(self, job_ids):
+        # Anything that is not a UUID cannot match and would fail the ::uuid[] cast
+        job_ids = [job_id for job_id in job_ids if _is_uuid(job_id)]
+        if self.postgres_connector is None or not job_ids:
+            return {}
+        conn = self.postgres_connector.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(LOOKUP_QUERY, (job_ids,))
+                columns = [column.name for column in cur.description]
+                rows = cur.fetchall()
+            conn.rollback()
+        finally:
+            self.postgres_connector.return_connection(conn)
+        return {row[0]: dict(zip(columns, row)) for row in rows}
+
+    def populate(self, jobs):
+        """Cache jobs (dicts or items with an _id) in bulk, one pipeline round-trip per chunk"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for count, job in enumerate(jobs, 1):
+            # Jobs from the spider carry a cached encoding; rows from PostgreSQL are plain dicts
+            value = job.encoded() if hasattr(job, 'encoded') else json.dumps(dict(job))
+            pipe.setex(f"{self.key_prefix}{job['_id']}", self.ttl, value)
+            if count % self.chunk_size == 0:
+                pipe.execute()
+        pipe.execute()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,207 @@
+import csv
+import io
+import sqlite3
+import threading
+import uuid
+from infra.postgresql_connector import PostgresConnector
+from infra.postgresql_schema import JOBS_INDEXES, create_jobs_indexes, ensure_jobs_table
+
+JOB_COLUMNS = (
+    '_id', 'companyName', 'correctDate', 'jobKey', 'source',
+    'jobPageUrl', 'annualSalaryAvg', 'city', 'zipcode'
+)
+
+# Namespace for the uuid5 job IDs; changing it re-keys every stored job
+JOB_ID_NAMESPACE = uuid.UUID('6f1c3a52-8d4e-4b7a-9e21-3c5d7f0a9b64')
+
+def job_id(source, job_key):
+    """The stable _id of a job from its source and feed req_id (the stored jobKey)"""
+    return str(uuid.uuid5(JOB_ID_NAMESPACE, f"{source}:{job_key}"))
+
+UPSERT_SQL = """
+    INSERT INTO jobs (_id, companyName, correctDate, jobKey, source,
+                    jobPageUrl, annualSalaryAvg, city, zipcode)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (_id) DO UPDATE SET
+        companyName = EXCLUDED.companyName,
+        correctDate = EXCLUDED.correctDate,
+        jobKey = EXCLUDED.jobKey,
+        source = EXCLUDED.source,
+        jobPageUrl = EXCLUDED.jobPageUrl,
+        annualSalaryAvg = EXCLUDED.annualSalaryAvg,
+        city = EXCLUDED.city,
+        zipcode = EXCLUDED.zipcode,
+        updatedAt = now()
+    RETURNING _id
+"""
+
+class PostgresJobStore:
+    """The jobs table in PostgreSQL, written through a PostgresConnector pool.
+
+    Every job store offers ensure_schema, create_indexes, upsert (one row),
+    upsert_many (one set-based batch), stats and close. Write methods roll
+    back and re-raise on failure; rows are tuples in JOB_COLUMNS order.
+    """
+    def __init__(self, connector, prepare_statements=True):
+        self.connector = connector
+        self.prepare_statements = prepare_statements
+
+    def ensure_schema(self):
+        """Create or migrate the jobs table and return True if it holds no rows yet"""
+        conn = self.connector.get_connection()
+        try:
+            return ensure_jobs_table(conn)
+        finally:
+            self.connector.return_connection(conn)
+
+    def create_indexes(self):
+        conn = self.connector.get_connection()
+        try:
+            create_jobs_indexes(conn)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.connector.return_connection(conn)
+
+    def upsert(self, row):
+        # The pool pings connections that sat idle, so there is no per-item SELECT 1
+        conn = self.connector.get_connection()
+        try:
+            with conn.cursor() as cur:
+                if self.prepare_statements:
+                    self.connector.execute_prepared(cur, 'jobs_upsert', UPSERT_SQL, row)
+                else:
+                    cur.execute(UPSERT_SQL, row)
+                result = cur.fetchone()
+            conn.commit()
+            return result[0]
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.connector.return_connection(conn)
+
+    def upsert_many(self, rows):
+        """Write rows in one transaction via COPY into a staging table and a set-based upsert"""
+        data = io.StringIO()
+        writer = csv.writer(data)
+        for seq, row in enumerate(rows):
+            # COPY reads empty unquoted fields back as NULL
+            writer.writerow(['' if value is None else value for value in row] + [seq])
+        data.seek(0)
+
+        columns = ', '.join(JOB_COLUMNS)
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in JOB_COLUMNS[1:]) + ', updatedAt = now()'
+
+        conn = self.connector.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS jobs_staging
+                    (LIKE jobs INCLUDING DEFAULTS, seq bigint) ON COMMIT DELETE ROWS
+                """)
+                cur.copy_expert(f"COPY jobs_staging ({columns}, seq) FROM STDIN WITH (FORMAT csv)", data)
+                # DISTINCT ON keeps one row per _id so ON CONFLICT never touches a row twice;
+                # ordering by seq makes that the batch's last row, as with per-item upserts
+                cur.execute(f"""
+                    INSERT INTO jobs ({columns})
+                    SELECT DISTINCT ON (_id) {columns} FROM jobs_staging
+                    ORDER BY _id, seq DESC
+                    ON CONFLICT (_id) DO UPDATE SET {updates}
+                """)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.connector.return_connection(conn)
+
+    def stats(self):
+        return self.connector.stats()
+
+    def close(self):
+        self.connector.close_all()
+
+SQLITE_JOBS_TABLE = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        _id TEXT PRIMARY KEY,
+        companyName TEXT,
+        correctDate TEXT,
+        jobKey TEXT,
+        source TEXT,
+        jobPageUrl TEXT,
+        annualSalaryAvg REAL,
+        city TEXT,
+        zipcode TEXT,
+        updatedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+SQLITE_UPSERT_SQL = f"""
+    INSERT INTO jobs ({', '.join(JOB_COLUMNS)})
+    VALUES ({', '.join('?' for _ in JOB_COLUMNS)})
+    ON CONFLICT (_id) DO UPDATE SET
+        {', '.join(f"{column} = excluded.{column}" for column in JOB_COLUMNS[1:])},
+        updatedAt = CURRENT_TIMESTAMP
+"""
+
+class SqliteJobStore:
+    """In-process stand-in for PostgresJobStore, backed by SQLite.
+
+    Takes a file path or ':memory:'. Keeps the same table, columns and
+    indexes, so the pipelines' parse and batching paths run unchanged on a
+    machine without PostgreSQL. One connection is shared behind a lock.
+    """
+    def __init__(self, path=':memory:'):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def ensure_schema(self):
+        with self.lock, self.conn:
+            self.conn.execute(SQLITE_JOBS_TABLE)
+            return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM jobs)").fetchone()[0] == 1
+
+    def create_indexes(self):
+        with self.lock, self.conn:
+            # PostgreSQL's index statements are plain enough to run on SQLite as they are
+            for statement in JOBS_INDEXES:
+                self.conn.execute(statement)
+
+    def upsert(self, row):
+        with self.lock, self.conn:
+            self.conn.execute(SQLITE_UPSERT_SQL, row)
+        return row[0]
+
+    def upsert_many(self, rows):
+        # One transaction per batch; executemany applies rows in order, so the last row for an _id wins
+        with self.lock, self.conn:
+            self.conn.executemany(SQLITE_UPSERT_SQL, rows)
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        self.conn.close()
+
+def open_job_store(postgres_settings):
+    """The job store for POSTGRES_SETTINGS['backend']: 'postgres' (default) or 'sqlite'.
+
+    Raises ConnectionError when PostgreSQL cannot be reached.
+    """
+    if postgres_settings.get('backend', 'postgres') == 'sqlite':
+        return SqliteJobStore(postgres_settings.get('sqlite_path') or ':memory:')
+
+    # The connector retries with exponential backoff and tests the connection
+    connector = PostgresConnector(
+        dbname=postgres_settings['database'],
+        user=postgres_settings['user'],
+        password=postgres_settings['password'],
+        host=postgres_settings['host'],
+        port=postgres_settings['port'],
+        min_size=postgres_settings.get('pool_min_size', 1),
+        max_size=postgres_settings.get('pool_max_size', 20),
+        max_retries=postgres_settings.get('connect_retries', 5),
+        idle_check_interval=postgres_settings.get('idle_check_interval', 30)
+    )
+    return PostgresJobStore(connector, postgres_settings.get('prepare_statements', True))
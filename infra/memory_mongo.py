@@ -0,0 +1,160 @@
+import copy
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+def _comparable(value):
+    # pymongo hands back naive UTC datetimes; compare aware ones the same way
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+OPERATORS = {
+    '$eq': lambda value, operand: value == operand,
+    '$ne': lambda value, operand: value != operand,
+    '$gt': lambda value, operand: value is not None and value > operand,
+    '$gte': lambda value, operand: value is not None and value >= operand,
+    '$lt': lambda value, operand: value is not None and value < operand,
+    '$lte': lambda value, operand: value is not None and value <= operand,
+    '$in': lambda value, operand: value in operand,
+}
+
+def matches(document, query):
+    """Whether a document matches a query of field equalities, comparison operators, $exists, $or and $and"""
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == '$and':
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+            value = _comparable(document.get(key))
+            for op, operand in condition.items():
+                if op == '$exists':
+                    if (key in document) != bool(operand):
+                        return False
+                    continue
+                if op not in OPERATORS:
+                    raise NotImplementedError(f"Query operator {op} is not supported by the in-memory backend")
+                if not OPERATORS[op](value, _comparable(operand)):
+                    return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+class MemoryCollection:
+    """In-process stand-in for a pymongo collection, covering what the pipelines and exports use"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents = {}
+
+    def create_index(self, keys, **kwargs):
+        return keys if isinstance(keys, str) else '_'.join(str(key) for key, _ in keys)
+
+    def _apply(self, query, update, upsert):
+        """Apply one update and return (matched, modified, upserted_id)"""
+        if '_id' in query and not isinstance(query['_id'], dict):
+            candidates = [self.documents[query['_id']]] if query['_id'] in self.documents else []
+        else:
+            candidates = list(self.documents.values())
+        document = next((candidate for candidate in candidates if matches(candidate, query)), None)
+
+        upserted_id = None
+        if document is None:
+            if not upsert:
+                return 0, 0, None
+            document = {key: value for key, value in query.items() if not key.startswith('$') and not isinstance(value, dict)}
+            upserted_id = document.get('_id')
+        before = copy.deepcopy(document)
+        self._update(document, update)
+        self.documents[document['_id']] = document
+
+        if upserted_id is not None:
+            return 0, 0, upserted_id
+        return 1, int(document != before), None
+
+    def _update(self, document, update):
+        for operator, fields in update.items():
+            if operator == '$set':
+                document.update(copy.deepcopy(fields))
+            elif operator == '$currentDate':
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                document.update({field: now for field in fields})
+            else:
+                raise NotImplementedError(f"Update operator {operator} is not supported by the in-memory backend")
+
+    def update_one(self, filter, update, upsert=False):
+        with self.lock:
+            matched, modified, upserted_id = self._apply(filter, update, upsert)
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_id=upserted_id)
+
+    def update_many(self, filter, update):
+        modified = 0
+        with self.lock:
+            documents = [document for document in self.documents.values() if matches(document, filter)]
+            for document in documents:
+                before = copy.deepcopy(document)
+                self._update(document, update)
+                modified += document != before
+        return SimpleNamespace(matched_count=len(documents), modified_count=modified, upserted_id=None)
+
+    def bulk_write(self, requests, ordered=True):
+        """Run UpdateOne requests; each is applied atomically, as on a server"""
+        matched = modified = upserted = 0
+        with self.lock:
+            for request in requests:
+                count, changed, upserted_id = self._apply(request._filter, request._doc, request._upsert)
+                matched += count
+                modified += changed
+                upserted += upserted_id is not None
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_count=upserted)
+
+    def find(self, filter=None, projection=None):
+        with self.lock:
+            found = [copy.deepcopy(document) for document in self.documents.values() if matches(document, filter or {})]
+        if projection:
+            fields = {field for field, include in projection.items() if include} | {'_id'}
+            found = [{key: value for key, value in document.items() if key in fields} for document in found]
+        return MemoryCursor(found)
+
+    def count_documents(self, filter):
+        with self.lock:
+            return sum(1 for document in self.documents.values() if matches(document, filter))
+
+class MemoryCursor(list):
+    def batch_size(self, size):
+        return self
+
+class MemoryDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, MemoryCollection())
+
+    def command(self, name, *args, **kwargs):
+        if name != 'ping':
+            raise NotImplementedError(f"Command {name} is not supported by the in-memory backend")
+        return {'ok': 1.0}
+
+class MemoryMongoClient:
+    """In-process stand-in for pymongo.MongoClient for runs without a MongoDB server.
+
+    Databases live for the life of the process and are shared by every client,
+    like a server. Queries support field equality, $eq/$ne/$gt/$gte/$lt/$lte/$in,
+    $or and $and; updates support $set and $currentDate.
+    """
+    _databases = {}
+    _lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self._databases.setdefault(name, MemoryDatabase())
+
+    @property
+    def admin(self):
+        return self['admin']
+
+    def close(self):
+        pass
@@ -0,0 +1,110 @@
+import threading
+import time
+
+class MemoryRedis:
+    """In-process stand-in for the redis-py client, for runs without a Redis server.
+
+    Covers the commands the pipelines, the feed manifest and JobCache use,
+    with key expiry and decode_responses=True semantics (values come back as
+    str). One instance per db is shared across the process, like a server.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.expires = {}
+
+    @classmethod
+    def shared(cls, db=0):
+        with cls._shared_lock:
+            if db not in cls._shared:
+                cls._shared[db] = cls()
+            return cls._shared[db]
+
+    def _live(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            del self.expires[key]
+        return key in self.values
+
+    def _store(self, key, value, ex=None):
+        self.values[key] = value.decode('utf-8') if isinstance(value, bytes) else str(value)
+        if ex:
+            self.expires[key] = time.monotonic() + ex
+        else:
+            self.expires.pop(key, None)
+
+    def get(self, key):
+        with self.lock:
+            return self.values[key] if self._live(key) else None
+
+    def mget(self, keys):
+        with self.lock:
+            return [self.values[key] if self._live(key) else None for key in keys]
+
+    def set(self, key, value, ex=None, get=False):
+        with self.lock:
+            previous = self.values[key] if self._live(key) else None
+            self._store(key, value, ex)
+        return previous if get else True
+
+    def setex(self, key, seconds, value):
+        with self.lock:
+            self._store(key, value, seconds)
+        return True
+
+    def delete(self, *keys):
+        with self.lock:
+            deleted = sum(1 for key in keys if self._live(key))
+            for key in keys:
+                self.values.pop(key, None)
+                self.expires.pop(key, None)
+        return deleted
+
+    def hgetall(self, key):
+        with self.lock:
+            return dict(self.values[key]) if self._live(key) else {}
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if field is not None:
+            fields[field] = value
+        with self.lock:
+            if not self._live(key):
+                self.values[key] = {}
+            hash_ = self.values[key]
+            added = sum(1 for name in fields if name not in hash_)
+            hash_.update({name: str(value) for name, value in fields.items()})
+        return added
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+    def flushdb(self):
+        with self.lock:
+            self.values.clear()
+            self.expires.clear()
+
+    def close(self):
+        pass
+
+class MemoryPipeline:
+    """Queues commands and runs them together on execute(), like a redis-py pipeline"""
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
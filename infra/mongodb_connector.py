@@ -0,0 +1,18 @@
+import pymongo
+from infra.memory_mongo import MemoryMongoClient
+
+class MongoConnector:
+    """MongoDB client for the configured backend: 'mongodb' or the in-process 'memory' stand-in"""
+    def __init__(self, host, port, username=None, password=None, backend='mongodb'):
+        if backend == 'memory':
+            self.client = MemoryMongoClient()
+            return
+        self.client = pymongo.MongoClient(
+            host=host,
+            port=port,
+            username=username,
+            password=password
+        )
+
+    def get_client(self):
+        return self.client
@@ -1,9 +1,19 @@
 import psycopg2
 from psycopg2 import pool
+import threading
 import time
 
 class PostgresConnector:
-    def __init__(self, dbname, user, password, host, port, max_retries=3, retry_delay=5):
+    """Thread-safe PostgreSQL connection pool.
+
+    get_connection blocks while max_size connections are checked out instead of
+    raising, and counts those waits as pool saturation. Connections are only
+    pinged when they sat idle longer than idle_check_interval; broken ones are
+    replaced, reconnecting with exponential backoff. psycopg2 closes returned
+    connections beyond min_size, so min_size is also how many stay open idle.
+    """
+    def __init__(self, dbname, user, password, host, port, min_size=1, max_size=20,
+                 max_retries=5, retry_delay=0.5, max_retry_delay=10, idle_check_interval=30):
         self.connection_params = {
             'dbname': dbname,
             'user': user,
@@ -11,38 +21,153 @@ class PostgresConnector:
             'host': host,
             'port': port
         }
+        self.min_size = min_size
+        self.max_size = max_size
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.idle_check_interval = idle_check_interval
         self.connection_pool = None
+        self.available = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        # Keyed by id(conn) like psycopg2's own pool; entries are dropped when a connection closes
+        self.last_used = {}
+        self.prepared = {}
+        self.counters = {
+            'checkouts': 0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'stale_connections': 0,
+            'reconnects': 0,
+        }
         self._initialize_pool()
 
+    def _backoff(self, attempt):
+        return min(self.retry_delay * 2 ** attempt, self.max_retry_delay)
+
     def _initialize_pool(self):
         for attempt in range(self.max_retries):
             try:
-                self.connection_pool = psycopg2.pool.SimpleConnectionPool(
-                    1, 20,
+                self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                    self.min_size, self.max_size,
                     **self.connection_params
                 )
                 # Test the connection
                 conn = self.connection_pool.getconn()
                 conn.cursor().execute('SELECT 1')
+                conn.rollback()
                 self.connection_pool.putconn(conn)
                 return
             except psycopg2.Error as e:
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                    time.sleep(self._backoff(attempt))
                 else:
                     raise ConnectionError(f"Failed to connect to PostgreSQL after {self.max_retries} attempts: {str(e)}")
 
     def get_connection(self):
         if not self.connection_pool:
             self._initialize_pool()
-        return self.connection_pool.getconn()
+
+        if not self.available.acquire(blocking=False):
+            started_at = time.monotonic()
+            self.available.acquire()
+            with self.lock:
+                self.counters['waits'] += 1
+                self.counters['wait_seconds'] += time.monotonic() - started_at
+
+        try:
+            conn = self._checkout()
+        except Exception:
+            self.available.release()
+            raise
+
+        with self.lock:
+            self.counters['checkouts'] += 1
+            self.counters['in_use'] += 1
+            self.counters['peak_in_use'] = max(self.counters['peak_in_use'], self.counters['in_use'])
+        return conn
+
+    def _checkout(self):
+        attempt = 0
+        while True:
+            try:
+                conn = self.connection_pool.getconn()
+            except psycopg2.OperationalError as e:
+                # Opening a new connection failed; the server may be restarting
+                attempt += 1
+                if attempt >= self.max_retries:
+                    raise ConnectionError(f"Failed to reconnect to PostgreSQL after {attempt} attempts: {str(e)}")
+                time.sleep(self._backoff(attempt - 1))
+                continue
+
+            if self._is_alive(conn):
+                return conn
+            # Every discard shrinks the idle set, so this ends on a fresh connection
+            self._discard(conn)
+
+    def _is_alive(self, conn):
+        if conn.closed:
+            return False
+        last_used = self.last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.idle_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self.lock:
+                self.counters['stale_connections'] += 1
+            return False
+
+    def _forget(self, conn):
+        self.last_used.pop(id(conn), None)
+        self.prepared.pop(id(conn), None)
+
+    def _discard(self, conn):
+        self._forget(conn)
+        self.connection_pool.putconn(conn, close=True)
+        with self.lock:
+            self.counters['reconnects'] += 1
 
     def return_connection(self, conn):
         if self.connection_pool:
-            self.connection_pool.putconn(conn)
+            # Connections broken mid-use are closed rather than handed out again
+            self.connection_pool.putconn(conn, close=bool(conn.closed))
+            if conn.closed:
+                self._forget(conn)
+            else:
+                self.last_used[id(conn)] = time.monotonic()
+        with self.lock:
+            self.counters['in_use'] -= 1
+        self.available.release()
+
+    def execute_prepared(self, cur, name, statement, params):
+        """Execute a %s-style statement as a server-side prepared statement.
+
+        The statement is prepared once per connection, so repeated calls skip
+        parsing and planning and only send EXECUTE with the parameters.
+        """
+        prepared = self.prepared.setdefault(id(cur.connection), set())
+        if name not in prepared:
+            parts = statement.split('%s')
+            numbered = parts[0] + ''.join(f"${index}{part}" for index, part in enumerate(parts[1:], 1))
+            cur.execute(f"PREPARE {name} AS {numbered}")
+            prepared.add(name)
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        stats['max_size'] = self.max_size
+        return stats
 
     def close_all(self):
         if self.connection_pool:
             self.connection_pool.closeall()
+        self.last_used.clear()
+        self.prepared.clear()
@@ -0,0 +1,59 @@
+JOBS_TABLE = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        _id UUID PRIMARY KEY,
+        companyName VARCHAR(255),
+        correctDate TIMESTAMP,
+        jobKey VARCHAR(255),
+        source VARCHAR(100),
+        jobPageUrl TEXT,
+        annualSalaryAvg DECIMAL(12,2),
+        city VARCHAR(100),
+        zipcode VARCHAR(10),
+        updatedAt TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+# Secondary indexes for the lookups run by query.py and the dashboards
+JOBS_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS jobs_jobkey_source_key ON jobs (jobKey, source)",
+    "CREATE INDEX IF NOT EXISTS jobs_correctdate_idx ON jobs (correctDate)",
+    "CREATE INDEX IF NOT EXISTS jobs_city_idx ON jobs (city)",
+    "CREATE INDEX IF NOT EXISTS jobs_zipcode_idx ON jobs (zipcode)",
+    "CREATE INDEX IF NOT EXISTS jobs_updatedat_idx ON jobs (updatedAt)",
+]
+
+def _column_type(cur, column):
+    cur.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'jobs' AND column_name = %s
+    """, (column,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def _migrate(cur):
+    """Bring a jobs table created by an older version up to the current definition"""
+    cur.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS updatedAt TIMESTAMPTZ NOT NULL DEFAULT now()")
+    cur.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS source VARCHAR(100)")
+
+    if _column_type(cur, '_id') == 'character varying':
+        cur.execute("ALTER TABLE jobs ALTER COLUMN _id TYPE UUID USING _id::uuid")
+
+    # INTEGER zipcodes lost their leading zeros; US zipcodes are always 5 digits
+    if _column_type(cur, 'zipcode') == 'integer':
+        cur.execute("ALTER TABLE jobs ALTER COLUMN zipcode TYPE VARCHAR(10) USING lpad(zipcode::text, 5, '0')")
+
+def ensure_jobs_table(conn):
+    """Create or migrate the jobs table and return True if it holds no rows yet"""
+    with conn.cursor() as cur:
+        cur.execute(JOBS_TABLE)
+        _migrate(cur)
+        cur.execute("SELECT NOT EXISTS (SELECT 1 FROM jobs)")
+        is_empty = cur.fetchone()[0]
+    conn.commit()
+    return is_empty
+
+def create_jobs_indexes(conn):
+    with conn.cursor() as cur:
+        for statement in JOBS_INDEXES:
+            cur.execute(statement)
+    conn.commit()
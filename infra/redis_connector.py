@@ -1,7 +1,12 @@
 import redis
+from infra.memory_redis import MemoryRedis
 
 class RedisConnector:
-    def __init__(self, host, port, db=0):
+    """Redis client for the configured backend: 'redis' or the in-process 'memory' stand-in"""
+    def __init__(self, host, port, db=0, backend='redis'):
+        if backend == 'memory':
+            self.redis_client = MemoryRedis.shared(db)
+            return
         self.redis_client = redis.Redis(
             host=host,
             port=port,
@@ -0,0 +1,222 @@
+import glob
+import io
+import json
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Every field the extract_* methods read has its own column, so replay only
+# decodes those. The rest of the record is kept as JSON in the raw column,
+# minus the description, which is the bulk of it and has a column of its own
+ARCHIVE_SCHEMA = pa.schema([
+    ('ingested_at', pa.timestamp('us', tz='UTC')),
+    ('feed', pa.string()),
+    ('ats_code', pa.string()),
+    ('req_id', pa.string()),
+    ('title', pa.string()),
+    ('hiring_organization', pa.string()),
+    ('brand', pa.string()),
+    ('employment_type', pa.string()),
+    ('create_date', pa.string()),
+    ('update_date', pa.string()),
+    ('description', pa.string()),
+    ('full_location', pa.string()),
+    ('city', pa.string()),
+    ('state', pa.string()),
+    ('country_code', pa.string()),
+    ('postal_code', pa.string()),
+    # Only set when the record has no postal_code key, as extract_zipcode falls back to it
+    ('derived_postal_code', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('salary_currency', pa.string()),
+    ('salary_value', pa.float64()),
+    ('salary_min_value', pa.float64()),
+    ('salary_max_value', pa.float64()),
+    ('categories', pa.list_(pa.string())),
+    ('apply_url', pa.string()),
+    ('canonical_url', pa.string()),
+    ('meta_canonical_url', pa.string()),
+    ('raw', pa.string()),
+])
+
+STRING_FIELDS = (
+    'ats_code', 'req_id', 'title', 'hiring_organization', 'brand', 'employment_type', 'create_date',
+    'update_date', 'description', 'full_location', 'city', 'state', 'country_code', 'apply_url', 'canonical_url'
+)
+NUMBER_FIELDS = ('latitude', 'longitude', 'salary_value', 'salary_min_value', 'salary_max_value')
+SALARY_FIELDS = ('salary_value', 'salary_min_value', 'salary_max_value')
+
+# Columns read back on replay, enough to rebuild what the extract_* methods see
+REPLAY_COLUMNS = (
+    'ats_code', 'req_id', 'hiring_organization', 'brand', 'create_date', 'description', 'full_location',
+    'city', 'postal_code', 'derived_postal_code', 'salary_value', 'salary_min_value', 'salary_max_value',
+    'apply_url', 'canonical_url', 'meta_canonical_url'
+)
+
+ARCHIVE_SUFFIXES = {'parquet': '.parquet', 'jsonl': '.jsonl.zst'}
+
+def _string(value):
+    return value if isinstance(value, str) else None
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+def _categories(job_data):
+    categories = job_data.get('categories')
+    if not isinstance(categories, list):
+        return None
+    names = [category.get('name') if isinstance(category, dict) else category for category in categories]
+    return [name for name in names if isinstance(name, str)]
+
+def archive_row(job_raw, feed, ingested_at):
+    """One row of ARCHIVE_SCHEMA for a raw feed record"""
+    job_data = job_raw.get('data') or {}
+    meta_data = job_data.get('meta_data') or {}
+    raw = {**job_raw, 'data': {key: value for key, value in job_data.items() if key != 'description'}}
+    row = {
+        'ingested_at': ingested_at,
+        'feed': feed,
+        'meta_canonical_url': _string(meta_data.get('canonical_url')),
+        'postal_code': _string(job_data.get('postal_code')),
+        'derived_postal_code': None,
+        'categories': _categories(job_data),
+        'raw': json.dumps(raw, ensure_ascii=False),
+    }
+    for field in STRING_FIELDS:
+        row[field] = _string(job_data.get(field))
+    for field in NUMBER_FIELDS:
+        row[field] = _number(job_data.get(field))
+    if 'postal_code' not in job_data:
+        locations = meta_data.get('googlejobs', {}).get('derivedInfo', {}).get('locations', [])
+        if locations:
+            row['derived_postal_code'] = _string(locations[0].get('postalAddress', {}).get('postalCode'))
+    return row
+
+def job_from_row(row):
+    """Rebuild the parts of a feed record the extract_* methods read from a replayed row"""
+    job_data = {}
+    for field in ('ats_code', 'req_id', 'hiring_organization', 'brand', 'create_date', 'description',
+                  'full_location', 'city', 'postal_code', 'apply_url', 'canonical_url'):
+        if row[field] is not None:
+            job_data[field] = row[field]
+    for field in SALARY_FIELDS:
+        value = row[field]
+        if value is not None:
+            # Feeds use integer amounts; keep them integers so the derived salaries encode the same
+            job_data[field] = int(value) if value.is_integer() else value
+
+    meta_data = {}
+    if row['meta_canonical_url'] is not None:
+        meta_data['canonical_url'] = row['meta_canonical_url']
+    if row['derived_postal_code'] is not None:
+        meta_data['googlejobs'] = {'derivedInfo': {'locations': [{'postalAddress': {'postalCode': row['derived_postal_code']}}]}}
+    if meta_data:
+        job_data['meta_data'] = meta_data
+    return {'data': job_data}
+
+class RawArchive:
+    """Writes raw feed records to a hive-partitioned archive for replay.
+
+    Records are buffered per source and written batch_size at a time as one
+    zstd-compressed file under ingest_date=YYYY-MM-DD/source=<source>/, either
+    Parquet with ARCHIVE_SCHEMA columns or JSONL of the records as they came.
+    Files are written under a dot-prefixed name and renamed when complete, so
+    readers never see a partial file.
+    """
+    def __init__(self, base_dir, format='parquet', batch_size=10000):
+        if format not in ARCHIVE_SUFFIXES:
+            raise ValueError(f"Unknown archive format {format!r}, expected one of {sorted(ARCHIVE_SUFFIXES)}")
+        self.base_dir = base_dir
+        self.format = format
+        self.batch_size = batch_size
+        self.ingested_at = datetime.now(timezone.utc)
+        # Unique per run and process, so worker processes never collide
+        self.run_id = f"{self.ingested_at:%H%M%S}-{os.getpid()}"
+        self.buffers = {}
+        # Files written per source, so feed checkpoints can wait for buffered records
+        self.flushes = {}
+        self.parts = 0
+        self.records = 0
+
+    def add(self, job_raw, feed, source):
+        if not isinstance(job_raw, dict):
+            return
+        if self.format == 'parquet':
+            entry = archive_row(job_raw, feed, self.ingested_at)
+        else:
+            entry = json.dumps(job_raw, ensure_ascii=False)
+        buffer = self.buffers.setdefault(source, [])
+        buffer.append(entry)
+        if len(buffer) >= self.batch_size:
+            self.flush(source)
+
+    def flush(self, source):
+        entries = self.buffers.pop(source, None)
+        if not entries:
+            return
+        directory = os.path.join(
+            self.base_dir,
+            f"ingest_date={self.ingested_at:%Y-%m-%d}",
+            f"source={quote(str(source), safe='')}"
+        )
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{self.run_id}-{self.parts:05d}{ARCHIVE_SUFFIXES[self.format]}"
+        tmp_path = os.path.join(directory, f".{name}")
+
+        if self.format == 'parquet':
+            table = pa.Table.from_pylist(entries, schema=ARCHIVE_SCHEMA)
+            pq.write_table(table, tmp_path, compression='zstd')
+        else:
+            with pa.CompressedOutputStream(tmp_path, 'zstd') as out:
+                out.write('\n'.join(entries).encode('utf-8') + b'\n')
+        os.replace(tmp_path, os.path.join(directory, name))
+        self.flushes[source] = self.flushes.get(source, 0) + 1
+        self.parts += 1
+        self.records += len(entries)
+
+    def flush_mark(self):
+        """Per source, the flush count at which every record buffered right now has been written"""
+        return {source: self.flushes.get(source, 0) + 1 for source in self.buffers}
+
+    def flushed_past(self, mark):
+        return all(self.flushes.get(source, 0) >= count for source, count in mark.items())
+
+    def close(self):
+        for source in list(self.buffers):
+            self.flush(source)
+
+def archive_files(base_dir, since=None, sources=None):
+    """List (source, path) for every archive file, optionally from ingest date ``since`` on"""
+    files = []
+    for directory in sorted(glob.glob(os.path.join(base_dir, 'ingest_date=*', 'source=*'))):
+        ingest_date = os.path.basename(os.path.dirname(directory)).split('=', 1)[1]
+        source = unquote(os.path.basename(directory).split('=', 1)[1])
+        if since and ingest_date < since:
+            continue
+        if sources and source not in sources:
+            continue
+        for suffix in ARCHIVE_SUFFIXES.values():
+            files.extend((source, path) for path in sorted(glob.glob(os.path.join(directory, f"part-*{suffix}"))))
+    return files
+
+def iter_archive_file(path, batch_size=10000):
+    """Yield feed records from one archive file.
+
+    Parquet files only decode REPLAY_COLUMNS, row group by row group, and the
+    records are rebuilt from them; JSONL files hold the records themselves.
+    """
+    if path.endswith(ARCHIVE_SUFFIXES['parquet']):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=list(REPLAY_COLUMNS)):
+            columns = batch.to_pydict()
+            for values in zip(*(columns[name] for name in REPLAY_COLUMNS)):
+                yield job_from_row(dict(zip(REPLAY_COLUMNS, values)))
+    else:
+        with pa.input_stream(path, compression='zstd') as stream:
+            for line in io.TextIOWrapper(stream, encoding='utf-8'):
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+FEED_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+DB_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def _is_feed_shape(date_str):
+    """True for the YYYY-MM-DDTHH:MM:SS+HHMM shape every known feed uses"""
+    return (
+        len(date_str) == 24
+        and date_str[4] == '-' and date_str[7] == '-' and date_str[10] == 'T'
+        and date_str[13] == ':' and date_str[16] == ':'
+        and date_str[19] in '+-'
+        # strptime's %z rejects offset minutes of 60 and over
+        and date_str[22] in '012345'
+    )
+
+def format_feed_date(date_str):
+    """Reformat a feed timestamp as YYYY-MM-DD HH:MM:SS, keeping its local time.
+
+    The common shape is validated by fromisoformat and reformatted by slicing,
+    which skips strptime's regex matching and strftime entirely; anything else
+    goes through strptime. Raises ValueError or TypeError for invalid input.
+    """
+    if isinstance(date_str, str) and _is_feed_shape(date_str):
+        datetime.fromisoformat(date_str)
+        return f"{date_str[:10]} {date_str[11:19]}"
+    return datetime.strptime(date_str, FEED_DATE_FORMAT).strftime(DB_DATE_FORMAT)
@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+def open_dead_letters(path, mode):
+    """Open a dead-letter file in binary mode, gzip-compressed when the path ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+def encode_item(item):
+    """JSON bytes for a failed item, reusing a JobItem's cached encoding"""
+    if hasattr(item, 'encoded'):
+        return item.encoded()
+    return json.dumps(dict(item), default=str).encode('utf-8')
+
+def read_dead_letters(path):
+    # Sniff the gzip magic number, since replay renames files away from their .gz suffix
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    with (gzip.open(path, 'rt', encoding='utf-8') if compressed else open(path, encoding='utf-8')) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class DeadLetterQueue:
+    """Appends items that failed a stage, with the stage and error, to a JSONL file.
+
+    Disabled until DeadLetterExtension configures a path. The file is opened
+    on the first failure, so a clean run never touches it; appending to a
+    gzip file adds a new member, which readers see as one stream.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.counts = {}
+
+    def configure(self, path):
+        self.close()
+        with self.lock:
+            self.path = path
+            self.counts = {}
+
+    def record(self, stage, item, error, **extra):
+        self.record_many(stage, [item], error, **extra)
+
+    def record_many(self, stage, items, error, **extra):
+        """Record every item of a batch that failed as a whole with the same error"""
+        failed_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        # The stage and error are encoded once per batch; each item's encoding is spliced in after them
+        header = json.dumps(
+            {'stage': stage, 'error': str(error), 'failed_at': failed_at, **extra}, default=str
+        )[:-1].encode('utf-8') + b', "item": '
+        lines = [header + encode_item(item) + b'}\n' for item in items]
+        with self.lock:
+            self.counts[stage] = self.counts.get(stage, 0) + len(lines)
+            if not self.path:
+                return
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self.file = open_dead_letters(self.path, 'ab')
+            self.file.writelines(lines)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+dead_letters = DeadLetterQueue()
+
+class DeadLetterExtension:
+    """Points the dead-letter queue at DEAD_LETTER_FILE for the duration of a crawl"""
+    def __init__(self, stats, path):
+        self.stats = stats
+        self.path = path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get('DEAD_LETTER_FILE')
+        if not path:
+            raise NotConfigured
+        extension = cls(crawler.stats, path)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        dead_letters.configure(self.path)
+
+    def spider_closed(self, spider, reason):
+        # Pipelines have closed and flushed by now, so every failure is counted
+        total = 0
+        for stage, count in sorted(dead_letters.counts.items()):
+            self.stats.set_value(f"dead_letters/{stage}", count)
+            total += count
+        if total:
+            spider.logger.warning(
+                f"{total} failed items written to {self.path}; re-run them with: python replay.py"
+            )
+        dead_letters.close()
@@ -0,0 +1,165 @@
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+class HotPathLog:
+    """Per-item log messages, sampled and rolled up into periodic summaries.
+
+    Disabled (LOG_MODE 'standard'), every message is logged. Enabled
+    ('hotpath'), each kind of message is logged the first time and then once
+    every sample_every times, warnings and errors at most rate_limit times,
+    per summary window; summarize() then reports how many of each were seen.
+    A kind is the logger, level and %-style format string, so callers pass
+    arguments lazily instead of formatting them into the message.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.sample_every = 1000
+        self.rate_limit = 10
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # (logger name, level, format string) -> [seen, logged]
+            self.counts = {}
+            self.window_started_at = time.monotonic()
+
+    def log(self, log, level, msg, *args):
+        if not log.isEnabledFor(level):
+            return
+        if self.enabled:
+            key = (log.name, level, msg)
+            with self.lock:
+                counts = self.counts.get(key)
+                if counts is None:
+                    counts = self.counts[key] = [0, 0]
+                counts[0] += 1
+                if level >= logging.WARNING:
+                    emit = counts[1] < self.rate_limit
+                else:
+                    emit = (counts[0] - 1) % self.sample_every == 0
+                if not emit:
+                    return
+                counts[1] += 1
+        log.log(level, msg, *args)
+
+    def debug(self, log, msg, *args):
+        self.log(log, logging.DEBUG, msg, *args)
+
+    def info(self, log, msg, *args):
+        self.log(log, logging.INFO, msg, *args)
+
+    def warning(self, log, msg, *args):
+        self.log(log, logging.WARNING, msg, *args)
+
+    def error(self, log, msg, *args):
+        self.log(log, logging.ERROR, msg, *args)
+
+    def summarize(self):
+        """Log one summary record per kind of message that was suppressed in the last window"""
+        with self.lock:
+            counts, self.counts = self.counts, {}
+            now = time.monotonic()
+            window, self.window_started_at = now - self.window_started_at, now
+        for (name, level, msg), (seen, logged) in sorted(counts.items()):
+            if seen > logged:
+                logger.log(
+                    max(level, logging.INFO),
+                    "summary logger=%s level=%s seen=%d logged=%d suppressed=%d window=%.1fs msg=%r",
+                    name, logging.getLevelName(level), seen, logged, seen - logged, window, msg
+                )
+
+hot_log = HotPathLog()
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Records never leave the process, so formatting is left to the listener thread
+        return record
+
+class HotPathLoggingExtension:
+    """Switches on hot_log and moves log file and console writes to a background thread.
+
+    Only enabled when LOG_MODE is 'hotpath'. Scrapy's stream handlers are
+    replaced on the root logger by a queue handler whose QueueListener
+    formats and writes the records, and the root logger's level is raised to
+    LOG_LEVEL so disabled messages are dropped before a record is built.
+    """
+    def __init__(self, level, summary_interval):
+        self.level = level
+        self.summary_interval = summary_interval
+        self.task = None
+        self.root = logging.getLogger()
+        self.root_level = self.root.level
+        self.handlers = []
+        self.queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+        self.listener = None
+        # Forked feed workers have no listener thread, so they write directly
+        os.register_at_fork(after_in_child=self.restore_handlers)
+
+    def install_queue_handler(self):
+        # Scrapy reinstalls its root handler after building extensions, so this waits for spider_opened
+        self.handlers = [handler for handler in self.root.handlers if isinstance(handler, logging.StreamHandler)]
+        for handler in self.handlers:
+            self.root.removeHandler(handler)
+        self.root.addHandler(self.queue_handler)
+        self.root_level = self.root.level
+        self.root.setLevel(max(self.root_level, self.level))
+        self.listener = logging.handlers.QueueListener(
+            self.queue_handler.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if settings.get('LOG_MODE', 'standard') != 'hotpath':
+            raise NotConfigured
+        level = settings.get('LOG_LEVEL')
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+
+        hot_log.sample_every = max(settings.getint('LOG_SAMPLE_EVERY', 1000), 1)
+        hot_log.rate_limit = settings.getint('LOG_RATE_LIMIT', 10)
+        extension = cls(level, settings.getfloat('LOG_SUMMARY_INTERVAL', 30))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.engine_stopped, signal=signals.engine_stopped)
+        return extension
+
+    def spider_opened(self, spider):
+        self.install_queue_handler()
+        hot_log.reset()
+        hot_log.enabled = True
+        if self.summary_interval > 0:
+            from twisted.internet import task
+            self.task = task.LoopingCall(hot_log.summarize)
+            self.task.start(self.summary_interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        hot_log.summarize()
+        hot_log.enabled = False
+
+    def engine_stopped(self):
+        # stop() writes out whatever is still queued; anything logged after that is written directly
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.restore_handlers()
+
+    def restore_handlers(self):
+        if self.queue_handler not in self.root.handlers:
+            return
+        self.root.removeHandler(self.queue_handler)
+        for handler in self.handlers:
+            self.root.addHandler(handler)
+        self.root.setLevel(self.root_level)
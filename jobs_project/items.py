@@ -1,11 +1,64 @@
-from scrapy import Item, Field
-
-class JobItem(Item):
-    _id = Field()  # Auto-generated primary key
-    companyName = Field()  # Company name
-    correctDate = Field()  # Format: YYYY-MM-DD HH:MM:SS
-    jobKey = Field()  # Scraped job key
-    jobPageUrl = Field()  # Job posting URL
-    annualSalaryAvg = Field()  # Average annual salary (computed)
-    city = Field()  # City name only
-    zipcode = Field()  # Integer zipcode
+from dataclasses import dataclass, fields
+import json
+
+class _EncodingSlot:
+    # Keeps JobItem's cached encoding out of the dataclass fields, so exporters never see it
+    __slots__ = ('_encoded',)
+
+@dataclass(slots=True)
+class JobItem(_EncodingSlot):
+    """A job listing as a slotted dataclass, which Scrapy accepts as an item.
+
+    Far smaller than a dict-backed scrapy.Item when millions are buffered, and
+    still readable as a mapping (item['city'], item.get('city'), dict(item)).
+    """
+    _id: str = None  # Auto-generated primary key
+    companyName: str = None  # Company name
+    correctDate: str = None  # Format: YYYY-MM-DD HH:MM:SS
+    jobKey: str = None  # Scraped job key
+    source: str = None  # Feed the job came from (ATS code or file name)
+    jobPageUrl: str = None  # Job posting URL
+    annualSalaryAvg: float = None  # Average annual salary (computed)
+    city: str = None  # City name only
+    zipcode: str = None  # 5-digit zipcode string (keeps leading zeros)
+
+    def __post_init__(self):
+        self._encoded = None
+
+    def __getitem__(self, key):
+        if key not in JOB_FIELD_NAMES:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in JOB_FIELD_NAMES:
+            raise KeyError(key)
+        setattr(self, key, value)
+        self._encoded = None
+
+    def get(self, key, default=None):
+        if key not in JOB_FIELD_NAMES:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return JOB_FIELDS
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in JOB_FIELDS]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in JOB_FIELDS}
+
+    def encoded(self):
+        """UTF-8 JSON of the fields, built on first use and shared by every consumer.
+
+        Cleared by item[...] assignment; setting attributes directly after the
+        first call leaves it stale.
+        """
+        if self._encoded is None:
+            self._encoded = json.dumps(self.to_dict(), default=str).encode('utf-8')
+        return self._encoded
+
+JOB_FIELDS = tuple(field.name for field in fields(JobItem))
+JOB_FIELD_NAMES = frozenset(JOB_FIELDS)
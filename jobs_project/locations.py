@@ -0,0 +1,36 @@
+import functools
+
+# Bound on distinct raw city strings kept in the normalization cache
+CITY_CACHE_SIZE = 10000
+
+# Words spelled the same way wherever they appear in a city name
+CITY_WORD_OVERRIDES = {
+    'saint': 'St.',
+    'st': 'St.',
+    'st.': 'St.',
+    'cdg': 'CDG',  # Airport code
+}
+
+# French articles stay lower case unless they start the name
+CITY_LOWERCASE_WORDS = frozenset(['en', 'la'])
+
+@functools.lru_cache(maxsize=CITY_CACHE_SIZE)
+def normalize_city(city):
+    """Title-case a raw city name while preserving special cases.
+
+    Feeds repeat the same few thousand cities, so results are memoized;
+    ``normalize_city.cache_info()`` reports hits and misses.
+    """
+    normalized_words = []
+    for i, word in enumerate(city.lower().split()):
+        if i != 0 and word in CITY_LOWERCASE_WORDS:
+            normalized_words.append(word)
+        elif word in CITY_WORD_OVERRIDES:
+            normalized_words.append(CITY_WORD_OVERRIDES[word])
+        elif word.startswith('mc'):
+            # Mc surnames
+            normalized_words.append('Mc' + word[2:].title())
+        else:
+            normalized_words.append(word.title())
+
+    return ' '.join(normalized_words)
@@ -0,0 +1,12 @@
+import logging
+from scrapy.logformatter import LogFormatter
+from .pipelines import UnchangedItem
+
+class JobsLogFormatter(LogFormatter):
+    def dropped(self, item, exception, response, spider):
+        entry = super().dropped(item, exception, response, spider)
+        # Unchanged re-crawled jobs are the common case; don't log each one with its full item
+        if isinstance(exception, UnchangedItem):
+            entry['level'] = logging.DEBUG
+            entry['msg'] = "Dropped: %(exception)s"
+        return entry
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+from .pipelines import BatchBuffer
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha1').hexdigest()
+
+class FeedManifest:
+    """Size, mtime, content hash and progress of every feed file, kept in one Redis hash"""
+    def __init__(self, redis_client, key):
+        self.redis_client = redis_client
+        self.key = key
+
+    def load(self):
+        return {path: json.loads(entry) for path, entry in self.redis_client.hgetall(self.key).items()}
+
+    def save(self, entries):
+        if entries:
+            self.redis_client.hset(self.key, mapping={path: json.dumps(entry) for path, entry in entries.items()})
+
+class FeedProgress:
+    """How far into one feed file every job has cleared the pipelines"""
+    def __init__(self, tracker, entry, start=0, resumable=True):
+        self.tracker = tracker
+        self.entry = entry
+        self.resumable = resumable
+        # Index the next parsed job gets, and the index before which every job is done
+        self.next_index = start
+        self.committed = start
+        self.finished = set()
+        self.parsed_all = False
+
+    def job_started(self):
+        index = self.next_index
+        self.next_index += 1
+        return index
+
+    def track(self, item, index):
+        """Hold the job open until its item clears the pipelines"""
+        self.tracker.items[id(item)] = (self, index)
+
+    def job_finished(self, index):
+        # Items can clear the pipelines out of order; only the contiguous prefix counts
+        self.finished.add(index)
+        while self.committed in self.finished:
+            self.finished.remove(self.committed)
+            self.committed += 1
+
+    def snapshot(self):
+        return {
+            **self.entry,
+            'complete': self.parsed_all and self.committed == self.next_index,
+            'resume_index': self.committed if self.resumable else 0,
+        }
+
+class FeedTracker:
+    """Decides which feed files need parsing and records how far each one got.
+
+    A checkpoint is only saved once every pipeline batch and raw archive
+    record that was buffered when it was taken has been written. Resumed
+    jobs are not skipped by the dedup stage either, since it only saves a
+    fingerprint after every store has the item. Resuming a file therefore
+    never skips a job that was not stored. At close the pipelines have
+    flushed, so the final state is exact.
+    """
+    def __init__(self, manifest, resume=True, archive=None):
+        self.manifest = manifest
+        self.resume = resume
+        self.archive = archive
+        self.entries = manifest.load()
+        self.files = {}
+        self.items = {}
+        self.pending = None
+        self.task = None
+
+    def plan(self, path, resumable=True):
+        """Return the FeedProgress to parse a file with, or None if it is complete and unchanged"""
+        entry = self.entries.get(path)
+        signature = file_signature(path)
+        if entry and (entry['size'], entry['mtime_ns']) == (signature['size'], signature['mtime_ns']):
+            signature['sha1'] = entry['sha1']
+        else:
+            # New, grown or merely touched: only the content hash can tell
+            signature['sha1'] = file_hash(path)
+
+        unchanged = entry is not None and entry['sha1'] == signature['sha1']
+        if unchanged and entry.get('complete'):
+            if entry['mtime_ns'] != signature['mtime_ns']:
+                self.manifest.save({path: {**entry, **signature}})
+            return None
+
+        resumable = resumable and self.resume
+        start = entry.get('resume_index', 0) if unchanged and resumable else 0
+        progress = self.files[path] = FeedProgress(self, signature, start, resumable)
+        return progress
+
+    def item_finished(self, item):
+        tracked = self.items.pop(id(item), None)
+        if tracked is not None:
+            progress, index = tracked
+            progress.job_finished(index)
+
+    def start(self, interval):
+        if interval > 0:
+            from twisted.internet import task
+            self.task = task.LoopingCall(self.checkpoint)
+            self.task.start(interval, now=False)
+
+    def checkpoint(self):
+        """Save the previous snapshot once its batches are flushed, then take a new one"""
+        if self.pending is not None:
+            snapshot, marks = self.pending
+            if not all(buffer.flushed_past(mark) for buffer, mark in marks):
+                return
+            self.manifest.save(snapshot)
+        buffers = list(BatchBuffer.instances)
+        if self.archive is not None:
+            buffers.append(self.archive)
+        self.pending = (
+            {path: progress.snapshot() for path, progress in self.files.items()},
+            [(buffer, buffer.flush_mark()) for buffer in buffers]
+        )
+
+    def close(self):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.manifest.save({path: progress.snapshot() for path, progress in self.files.items()})
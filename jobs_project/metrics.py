@@ -0,0 +1,255 @@
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+
+# Upper bounds in seconds for latency histograms
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf
+)
+
+# Upper bounds in items for batch flush sizes
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf)
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are reported as the bucket's upper bound"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+class StageMetrics:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.latency.merge(other.latency)
+        self.batch_sizes.merge(other.batch_sizes)
+
+class MetricsRegistry:
+    """Process-wide counters, latency histograms and batch sizes per stage.
+
+    Disabled until MetricsExtension turns it on, so instrumented code costs a
+    single flag check when metrics are off.
+    """
+    def __init__(self):
+        self.enabled = False
+        # Per-extractor stages run about ten times per job, so they are only timed on request
+        self.detailed = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.generation += 1
+            # One {stage: StageMetrics} per recording thread, written only by that
+            # thread without a lock and merged when read
+            self.thread_stages = []
+            self.started_at = time.monotonic()
+
+    def _stage(self, stage):
+        local = self.local
+        if getattr(local, 'generation', None) != self.generation:
+            local.stages = {}
+            local.generation = self.generation
+            with self.lock:
+                self.thread_stages.append(local.stages)
+        metrics = local.stages.get(stage)
+        if metrics is None:
+            metrics = local.stages[stage] = StageMetrics()
+        return metrics
+
+    def stages(self):
+        """Every thread's metrics merged per stage; a read racing a write may be off by one call"""
+        with self.lock:
+            thread_stages = list(self.thread_stages)
+        merged = {}
+        for stages in thread_stages:
+            for stage, metrics in list(stages.items()):
+                merged.setdefault(stage, StageMetrics()).merge(metrics)
+        return merged
+
+    def observe(self, stage, seconds, error=False):
+        metrics = self._stage(stage)
+        metrics.count += 1
+        metrics.latency.observe(seconds)
+        if error:
+            metrics.errors += 1
+
+    def record_error(self, stage):
+        """Count an error that the stage handled itself instead of raising"""
+        if not self.enabled:
+            return
+        self._stage(stage).errors += 1
+
+    def record_batch(self, stage, size):
+        if not self.enabled:
+            return
+        self._stage(stage).batch_sizes.observe(size)
+
+    def timed(self, stage, detail=False):
+        """Decorator recording call count, latency and raised errors under ``stage``
+
+        ``detail`` stages are only recorded while ``detailed`` is set.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or (detail and not self.detailed):
+                    return func(*args, **kwargs)
+                started_at = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except DropItem:
+                    self.observe(stage, time.perf_counter() - started_at)
+                    raise
+                except Exception:
+                    self.observe(stage, time.perf_counter() - started_at, error=True)
+                    raise
+                self.observe(stage, time.perf_counter() - started_at)
+                return result
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        snapshot = {}
+        for stage, metrics in sorted(self.stages().items()):
+            values = {
+                'count': metrics.count,
+                'errors': metrics.errors,
+                'items_per_sec': round(metrics.count / elapsed, 2),
+                'p50_ms': round(metrics.latency.quantile(0.50) * 1000, 3),
+                'p95_ms': round(metrics.latency.quantile(0.95) * 1000, 3),
+                'p99_ms': round(metrics.latency.quantile(0.99) * 1000, 3),
+            }
+            if metrics.batch_sizes.count:
+                values['batches'] = metrics.batch_sizes.count
+                values['avg_batch_size'] = round(metrics.batch_sizes.sum / metrics.batch_sizes.count, 1)
+            snapshot[stage] = values
+        return snapshot
+
+    def to_prometheus(self):
+        """Render all stages in the Prometheus text exposition format"""
+        lines = []
+        stages = sorted(self.stages().items())
+        lines.append("# TYPE jobs_stage_latency_seconds histogram")
+        for stage, metrics in stages:
+            lines.extend(_histogram_lines('jobs_stage_latency_seconds', stage, metrics.latency))
+        lines.append("# TYPE jobs_stage_errors_total counter")
+        for stage, metrics in stages:
+            lines.append(f'jobs_stage_errors_total{{stage="{stage}"}} {metrics.errors}')
+        lines.append("# TYPE jobs_batch_size histogram")
+        for stage, metrics in stages:
+            if metrics.batch_sizes.count:
+                lines.extend(_histogram_lines('jobs_batch_size', stage, metrics.batch_sizes))
+        return "\n".join(lines) + "\n"
+
+def _histogram_lines(name, stage, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        le = '+Inf' if bound == math.inf else repr(bound)
+        lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+    lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+    lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+    return lines
+
+registry = MetricsRegistry()
+timed = registry.timed
+
+class MetricsExtension:
+    """Publishes stage metrics to Scrapy stats and a Prometheus text file"""
+    def __init__(self, stats, metrics_file, dump_interval, detailed=False):
+        self.stats = stats
+        self.detailed = detailed
+        self.metrics_file = metrics_file
+        self.dump_interval = dump_interval
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('METRICS_ENABLED'):
+            raise NotConfigured
+        extension = cls(
+            crawler.stats,
+            crawler.settings.get('METRICS_FILE'),
+            crawler.settings.getfloat('METRICS_DUMP_INTERVAL'),
+            crawler.settings.getbool('METRICS_DETAILED')
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        registry.reset()
+        registry.detailed = self.detailed
+        registry.enabled = True
+        if self.metrics_file and self.dump_interval > 0:
+            from twisted.internet import task
+            self.task = task.LoopingCall(self.dump)
+            self.task.start(self.dump_interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+
+        for stage, values in registry.snapshot().items():
+            for key, value in values.items():
+                self.stats.set_value(f"metrics/{stage}/{key}", value)
+            spider.logger.info(
+                f"Stage {stage}: {values['count']} calls, {values['errors']} errors, "
+                f"{values['items_per_sec']}/s, p50 {values['p50_ms']}ms, "
+                f"p95 {values['p95_ms']}ms, p99 {values['p99_ms']}ms"
+                + (f", {values['batches']} batches of {values['avg_batch_size']} avg" if 'batches' in values else "")
+            )
+        self.dump()
+        registry.enabled = False
+
+    def dump(self):
+        if not self.metrics_file:
+            return
+        # Write then rename so scrapers never read a half-written file
+        os.makedirs(os.path.dirname(self.metrics_file) or '.', exist_ok=True)
+        tmp_file = f"{self.metrics_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(registry.to_prometheus())
+        os.replace(tmp_file, self.metrics_file)
@@ -1,209 +1,647 @@
-from infra.postgresql_connector import PostgresConnector
+from infra.job_store import JOB_COLUMNS, open_job_store
+from infra.mongodb_connector import MongoConnector
 from infra.redis_connector import RedisConnector
-import json
-import pymongo
+from .deadletter import dead_letters
+from .hotlog import hot_log
+from .metrics import registry, timed
+from scrapy import signals
+from scrapy.exceptions import DropItem
+from twisted.internet.defer import DeferredSemaphore
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+import hashlib
+import threading
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 import time
+import weakref
 
-class PostgresPipeline:
+class UnchangedItem(DropItem):
+    """Raised for items whose content matches the last stored version"""
+
+def item_fingerprint(item):
+    """Hash of the item's encoding, which the Redis pipeline then reuses as its value"""
+    return hashlib.sha1(item.encoded()).hexdigest()
+
+class FingerprintLedger:
+    """Fingerprints of items on their way to storage, kept until every store has them.
+
+    RedisDedupPipeline only reads stored fingerprints and hands new ones to
+    the ledger. The storage pipelines report every write they finish. A
+    fingerprint is ready to be saved once each registered store has written
+    its item, and is dropped if any of them fails. An item that was buffered
+    or failed is therefore never skipped as unchanged by a later run. Stores
+    report their close after their final flush, so the last fingerprints can
+    be saved once all of them have closed, in whatever order they close.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = set()
+        self.open_stages = set()
+        self.on_closed = None
+        self.pending = {}
+        self.ready = []
+
+    def register(self, stage):
+        with self.lock:
+            self.stages.add(stage)
+            self.open_stages.add(stage)
+
+    def close(self, stage):
+        """Called by a storage pipeline once its last batch is written"""
+        with self.lock:
+            self.open_stages.discard(stage)
+            callback = None if self.open_stages else self.on_closed
+            if callback is not None:
+                self.on_closed = None
+        if callback is not None:
+            callback()
+
+    def when_closed(self, callback):
+        """Run callback once every registered store has closed, right away if they all have"""
+        with self.lock:
+            if self.open_stages:
+                self.on_closed = callback
+                return
+        callback()
+
+    def reset(self):
+        with self.lock:
+            self.pending = {}
+            self.ready = []
+
+    def add(self, job_id, fingerprint):
+        with self.lock:
+            if self.stages:
+                self.pending[job_id] = (fingerprint, set(self.stages))
+            else:
+                self.ready.append((job_id, fingerprint))
+
+    def in_flight(self, job_id):
+        """The fingerprint of the copy of this job that is being stored, if any"""
+        with self.lock:
+            entry = self.pending.get(job_id)
+        return entry[0] if entry else None
+
+    def stored(self, stage, job_ids):
+        if not self.pending:
+            return
+        with self.lock:
+            for job_id in job_ids:
+                entry = self.pending.get(job_id)
+                if entry is None:
+                    continue
+                entry[1].discard(stage)
+                if not entry[1]:
+                    del self.pending[job_id]
+                    self.ready.append((job_id, entry[0]))
+
+    def failed(self, job_ids):
+        if not self.pending:
+            return
+        with self.lock:
+            for job_id in job_ids:
+                self.pending.pop(job_id, None)
+
+    def take_ready(self):
+        with self.lock:
+            ready, self.ready = self.ready, []
+        return ready
+
+fingerprints = FingerprintLedger()
+
+class BatchBuffer:
+    """Collects pending writes until a size or age threshold is reached.
+
+    Every live buffer is listed in BatchBuffer.instances and counts the batches
+    it has drained and the ones its pipeline finished writing, so callers can
+    tell when everything buffered at some point has reached storage.
+    """
+    instances = weakref.WeakSet()
+
+    def __init__(self, size, interval=0):
+        self.size = size
+        self.interval = interval
+        self.entries = []
+        self.started_at = None
+        self.drained = 0
+        self.flushed = 0
+        BatchBuffer.instances.add(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry):
+        if not self.entries:
+            self.started_at = time.monotonic()
+        self.entries.append(entry)
+
+    def is_full(self):
+        if not self.entries:
+            return False
+        if len(self.entries) >= self.size:
+            return True
+        return bool(self.interval) and time.monotonic() - self.started_at >= self.interval
+
+    def drain(self):
+        entries, self.entries = self.entries, []
+        self.started_at = None
+        if entries:
+            self.drained += 1
+        return entries
+
+    def mark_flushed(self):
+        """Called by the pipeline once a drained batch is written or dead-lettered"""
+        self.flushed += 1
+
+    def flush_mark(self):
+        """The flushed count at which everything buffered right now has been written"""
+        return self.drained + (1 if self.entries else 0)
+
+    def flushed_past(self, mark):
+        return self.flushed >= mark
+
+class IntervalFlushMixin:
+    """Flushes ``self.buffer`` from a reactor timer once its batch interval has passed.
+
+    BatchBuffer.is_full only checks the age of a batch when the next item is
+    added, so without the timer a quiet feed would hold its last rows until
+    the spider closes. The timer starts on spider_opened, after open_spider.
+    """
+    flush_timer = None
+
+    def start_flush_timer(self, spider):
+        if self.buffer is None or not self.buffer.interval:
+            return
+        from twisted.internet import task
+        # Checked twice per interval, so a batch waits at most 1.5 intervals
+        self.flush_timer = task.LoopingCall(self.flush_due, spider)
+        self.flush_timer.start(self.buffer.interval / 2, now=False)
+
+    def stop_flush_timer(self):
+        if self.flush_timer is not None and self.flush_timer.running:
+            self.flush_timer.stop()
+
+    def flush_due(self, spider):
+        if self.buffer.is_full():
+            self.flush(spider)
+
+class RedisDedupPipeline:
+    """Drops items that are unchanged since the last run before any database work"""
+    # Stored fingerprints are written in pipelined batches of this size
+    commit_batch_size = 500
+
+    def __init__(self, redis_settings):
+        self.redis_settings = redis_settings
+        self.key_prefix = redis_settings.get('fingerprint_prefix', 'fingerprint:')
+        self.ttl = redis_settings.get('fingerprint_ttl') or None
+        self.items_skipped = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.get('REDIS_SETTINGS'))
+
+    def open_spider(self, spider):
+        self.connector = RedisConnector(
+            host=self.redis_settings['host'],
+            port=self.redis_settings['port'],
+            db=self.redis_settings['db'],
+            backend=self.redis_settings.get('backend', 'redis')
+        )
+        self.redis_client = self.connector.get_client()
+        fingerprints.reset()
+
+    @timed('pipeline.RedisDedupPipeline')
+    def process_item(self, item, spider):
+        if len(fingerprints.ready) >= self.commit_batch_size:
+            self.commit_fingerprints(spider)
+        if not item.get('_id'):
+            return item
+
+        fingerprint = item_fingerprint(item)
+        try:
+            # Only read here; the fingerprint is saved once every store has the item
+            previous = self.redis_client.get(f"{self.key_prefix}{item['_id']}")
+        except Exception as e:
+            registry.record_error('pipeline.RedisDedupPipeline')
+            hot_log.error(spider.logger, "Redis dedup error: %s", e)
+            return item
+
+        if fingerprint in (previous, fingerprints.in_flight(item['_id'])):
+            self.items_skipped += 1
+            raise UnchangedItem(f"Unchanged item {item['_id']}")
+        fingerprints.add(item['_id'], fingerprint)
+        return item
+
+    def commit_fingerprints(self, spider):
+        """Save the fingerprints of items every storage pipeline has written, in one round-trip"""
+        ready = fingerprints.take_ready()
+        if not ready:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for job_id, fingerprint in ready:
+                pipe.set(f"{self.key_prefix}{job_id}", fingerprint, ex=self.ttl)
+            pipe.execute()
+        except Exception as e:
+            # Unsaved fingerprints only mean the items are written again next run
+            registry.record_error('pipeline.RedisDedupPipeline')
+            hot_log.error(spider.logger, "Redis error saving %d fingerprints: %s", len(ready), e)
+
+    def close_spider(self, spider):
+        spider.logger.info(f"Total unchanged items skipped by Redis dedup pipeline: {self.items_skipped}")
+        # The storage pipelines may still be flushing, with or without a crawler
+        # driving them, so the last fingerprints are saved after the last one closes
+        fingerprints.when_closed(lambda: self.finish(spider))
+
+    def finish(self, spider):
+        self.commit_fingerprints(spider)
+        self.redis_client.close()
+
+class PostgresPipeline(IntervalFlushMixin):
     def __init__(self, postgres_settings):
         self.postgres_settings = postgres_settings
-        self.connector = None
+        self.store = None
         self.items_processed = 0
-        
+        self.defer_indexes = False
+        # A batch size above 1 switches from per-item upserts to buffered set-based writes
+        batch_size = postgres_settings.get('batch_size', 0)
+        self.buffer = None
+        if batch_size > 1:
+            self.buffer = BatchBuffer(batch_size, postgres_settings.get('batch_interval', 0))
+
     @classmethod
     def from_crawler(cls, crawler):
-        return cls(crawler.settings.get('POSTGRES_SETTINGS'))
+        pipeline = cls(crawler.settings.get('POSTGRES_SETTINGS'))
+        crawler.signals.connect(pipeline.start_flush_timer, signal=signals.spider_opened)
+        return pipeline
     
     def open_spider(self, spider):
-        max_retries = 3
-        retry_delay = 5  # seconds
-        
-        for attempt in range(max_retries):
-            try:
-                spider.logger.info(f"Attempting PostgreSQL connection (attempt {attempt + 1}/{max_retries})")
-                self.connector = PostgresConnector(
-                    dbname=self.postgres_settings['database'],
-                    user=self.postgres_settings['user'],
-                    password=self.postgres_settings['password'],
-                    host=self.postgres_settings['host'],
-                    port=self.postgres_settings['port']
-                )
-                
-                # Test the connection
-                conn = self.connector.get_connection()
-                cur = conn.cursor()
-                cur.execute("SELECT 1")
-                cur.close()
-                self.connector.return_connection(conn)
-                
-                spider.logger.info("PostgreSQL connection successful")
-                break
-                
-            except Exception as e:
-                spider.logger.error(f"PostgreSQL connection attempt {attempt + 1} failed: {str(e)}")
-                if attempt < max_retries - 1:
-                    spider.logger.info(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                else:
-                    spider.logger.error("All PostgreSQL connection attempts failed")
-                    self.connector = None
+        fingerprints.register('PostgresPipeline')
+        backend = self.postgres_settings.get('backend', 'postgres')
+        try:
+            spider.logger.info(f"Connecting to the jobs table ({backend})")
+            self.store = open_job_store(self.postgres_settings)
+            spider.logger.info(f"Jobs table connection successful ({backend})")
+        except ConnectionError as e:
+            spider.logger.error(f"All PostgreSQL connection attempts failed: {str(e)}")
+            self.store = None
         
-        # Create table if it doesn't exist
-        if self.connector:
-            conn = self.connector.get_connection()
-            cur = conn.cursor()
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS jobs (
-                    _id VARCHAR(36) PRIMARY KEY,
-                    companyName VARCHAR(255),
-                    correctDate TIMESTAMP,
-                    jobKey VARCHAR(255),
-                    jobPageUrl TEXT,
-                    annualSalaryAvg DECIMAL(12,2),
-                    city VARCHAR(100),
-                    zipcode INTEGER
-                )
-            """)
-            conn.commit()
-            self.connector.return_connection(conn)
+        # Create or migrate the table if needed
+        if self.store:
+            is_empty = self.store.ensure_schema()
+            # On an initial bulk load, building indexes once at the end is far
+            # cheaper than maintaining them row by row
+            self.defer_indexes = is_empty and self.postgres_settings.get('defer_indexes', True)
+            if self.defer_indexes:
+                spider.logger.info("jobs table is empty, deferring index builds until the load finishes")
+            else:
+                self.store.create_indexes()
     
+    @timed('pipeline.PostgresPipeline')
     def process_item(self, item, spider):
-        if not self.connector:
-            spider.logger.warning("PostgreSQL connector not initialized, skipping item")
+        if not self.store:
+            hot_log.warning(spider.logger, "PostgreSQL connector not initialized, skipping item")
+            fingerprints.failed([item.get('_id')])
+            dead_letters.record('pipeline.PostgresPipeline', item, "PostgreSQL connector not initialized")
             return item
-            
-        conn = None
+
+        if self.buffer is not None:
+            self.buffer.add(tuple(item.get(column) for column in JOB_COLUMNS))
+            if self.buffer.is_full():
+                self.flush(spider)
+            return item
+
         try:
-            # Get connection and verify it's still valid
-            conn = self.connector.get_connection()
-            cur = conn.cursor()
-            cur.execute("SELECT 1")  # Test connection
-            
             # Log item details before insert
-            spider.logger.info(f"Attempting to save item with _id: {item.get('_id')}")
-            
-            cur.execute("""
-                INSERT INTO jobs (_id, companyName, correctDate, jobKey, 
-                                jobPageUrl, annualSalaryAvg, city, zipcode)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (_id) DO UPDATE SET
-                    companyName = EXCLUDED.companyName,
-                    correctDate = EXCLUDED.correctDate,
-                    jobKey = EXCLUDED.jobKey,
-                    jobPageUrl = EXCLUDED.jobPageUrl,
-                    annualSalaryAvg = EXCLUDED.annualSalaryAvg,
-                    city = EXCLUDED.city,
-                    zipcode = EXCLUDED.zipcode
-                RETURNING _id
-            """, (
-                item.get('_id'),
-                item.get('companyName'),
-                item.get('correctDate'),
-                item.get('jobKey'),
-                item.get('jobPageUrl'),
-                item.get('annualSalaryAvg'),
-                item.get('city'),
-                item.get('zipcode')
-            ))
+            hot_log.info(spider.logger, "Attempting to save item with _id: %s", item.get('_id'))
             
-            result = cur.fetchone()
-            conn.commit()
+            result = self.store.upsert(tuple(item.get(column) for column in JOB_COLUMNS))
             
             self.items_processed += 1
-            spider.logger.info(f"Successfully saved item {result[0]}. Total items processed: {self.items_processed}")
+            fingerprints.stored('PostgresPipeline', [item.get('_id')])
+            hot_log.info(spider.logger, "Successfully saved item %s. Total items processed: %d", result, self.items_processed)
             
         except Exception as e:
-            if conn:
-                conn.rollback()
-            spider.logger.error(f"Error inserting item: {e}")
-            spider.logger.error(f"Failed item data: {dict(item)}")
-        finally:
-            if conn:
-                cur.close()
-                self.connector.return_connection(conn)
+            registry.record_error('pipeline.PostgresPipeline')
+            fingerprints.failed([item.get('_id')])
+            hot_log.error(spider.logger, "Error inserting item %s: %s", item.get('_id'), e)
+            dead_letters.record('pipeline.PostgresPipeline', item, e)
         
         return item
     
+    @timed('flush.PostgresPipeline')
+    def flush(self, spider):
+        """Write buffered rows in one transaction with the store's set-based upsert"""
+        rows = self.buffer.drain()
+        if not rows:
+            return
+        registry.record_batch('flush.PostgresPipeline', len(rows))
+
+        try:
+            self.store.upsert_many(rows)
+            self.items_processed += len(rows)
+            fingerprints.stored('PostgresPipeline', [row[0] for row in rows])
+            hot_log.info(spider.logger, "Flushed %d items to PostgreSQL. Total items processed: %d", len(rows), self.items_processed)
+
+        except Exception as e:
+            registry.record_error('flush.PostgresPipeline')
+            fingerprints.failed([row[0] for row in rows])
+            hot_log.error(spider.logger, "Error flushing batch of %d items to PostgreSQL: %s", len(rows), e)
+            dead_letters.record_many('flush.PostgresPipeline', (dict(zip(JOB_COLUMNS, row)) for row in rows), e)
+        finally:
+            self.buffer.mark_flushed()
+
+    def build_indexes(self, spider):
+        try:
+            started_at = time.monotonic()
+            self.store.create_indexes()
+            spider.logger.info(f"Built jobs indexes in {time.monotonic() - started_at:.1f}s")
+        except Exception as e:
+            spider.logger.error(f"Error building jobs indexes: {e}")
+
+    def log_pool_stats(self, spider):
+        stats = self.store.stats()
+        # Stand-in stores have no connection pool to report on
+        if not stats:
+            return
+        crawler = getattr(spider, 'crawler', None)
+        if crawler is not None:
+            for key, value in stats.items():
+                crawler.stats.set_value(f"postgres_pool/{key}", value)
+        spider.logger.info(
+            f"PostgreSQL pool: {stats['checkouts']} checkouts, peak {stats['peak_in_use']}/{stats['max_size']} in use, "
+            f"{stats['waits']} waits ({stats['wait_seconds']}s), {stats['reconnects']} reconnects"
+        )
+
     def close_spider(self, spider):
-        if self.connector:
-            spider.logger.info(f"Total items processed by PostgreSQL pipeline: {self.items_processed}")
-            self.connector.close_all()
+        self.stop_flush_timer()
+        try:
+            if self.store:
+                if self.buffer is not None:
+                    self.flush(spider)
+                if self.defer_indexes:
+                    self.build_indexes(spider)
+                spider.logger.info(f"Total items processed by PostgreSQL pipeline: {self.items_processed}")
+                self.log_pool_stats(spider)
+                self.store.close()
+        finally:
+            fingerprints.close('PostgresPipeline')
 
-class RedisPipeline:
+class RedisPipeline(IntervalFlushMixin):
     def __init__(self, redis_settings):
         self.redis_settings = redis_settings
+        self.ttl = redis_settings.get('ttl', 3600)
+        self.key_prefix = redis_settings.get('key_prefix', 'job:')
+        # A batch size above 1 queues SETEX commands into a redis-py pipeline
+        batch_size = redis_settings.get('batch_size', 0)
+        self.buffer = None
+        if batch_size > 1:
+            self.buffer = BatchBuffer(batch_size, redis_settings.get('batch_interval', 0))
     
     @classmethod
     def from_crawler(cls, crawler):
-        return cls(crawler.settings.get('REDIS_SETTINGS'))
+        pipeline = cls(crawler.settings.get('REDIS_SETTINGS'))
+        crawler.signals.connect(pipeline.start_flush_timer, signal=signals.spider_opened)
+        return pipeline
     
     def open_spider(self, spider):
         self.connector = RedisConnector(
             host=self.redis_settings['host'],
             port=self.redis_settings['port'],
-            db=self.redis_settings['db']
+            db=self.redis_settings['db'],
+            backend=self.redis_settings.get('backend', 'redis')
         )
         self.redis_client = self.connector.get_client()
+        fingerprints.register('RedisPipeline')
     
+    @timed('pipeline.RedisPipeline')
     def process_item(self, item, spider):
         try:
             if not item.get('_id'):
-                spider.logger.error("Missing _id field in item")
+                hot_log.error(spider.logger, "Missing _id field in item")
                 return item
                 
-            # Convert item to dict and ensure all fields are serializable
-            item_dict = dict(item)
+            if self.buffer is not None:
+                # Buffer the item itself; its key and cached encoding are built at flush time
+                self.buffer.add(item)
+                if self.buffer.is_full():
+                    self.flush(spider)
+                return item
             
             # Cache item in Redis using job ID as key
-            self.redis_client.setex(
-                f"job:{item['_id']}", 
-                3600,  # Cache for 1 hour
-                json.dumps(item_dict)
-            )
+            self.redis_client.setex(f"{self.key_prefix}{item['_id']}", self.ttl, item.encoded())
+            fingerprints.stored('RedisPipeline', [item['_id']])
         except Exception as e:
-            spider.logger.error(f"Redis error: {str(e)}")
+            registry.record_error('pipeline.RedisPipeline')
+            fingerprints.failed([item.get('_id')])
+            hot_log.error(spider.logger, "Redis error: %s", e)
+            dead_letters.record('pipeline.RedisPipeline', item, e)
         return item
 
-class MongoDBPipeline:
+    @timed('flush.RedisPipeline')
+    def flush(self, spider):
+        """Send all queued SETEX commands in one round-trip"""
+        entries = self.buffer.drain()
+        if not entries:
+            return
+        registry.record_batch('flush.RedisPipeline', len(entries))
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=self.redis_settings.get('transaction', False))
+            for item in entries:
+                pipe.setex(f"{self.key_prefix}{item['_id']}", self.ttl, item.encoded())
+            pipe.execute()
+            fingerprints.stored('RedisPipeline', [item['_id'] for item in entries])
+        except Exception as e:
+            registry.record_error('flush.RedisPipeline')
+            fingerprints.failed([item['_id'] for item in entries])
+            hot_log.error(spider.logger, "Redis error flushing batch of %d items: %s", len(entries), e)
+            dead_letters.record_many('flush.RedisPipeline', entries, e)
+        self.buffer.mark_flushed()
+
+    def close_spider(self, spider):
+        self.stop_flush_timer()
+        try:
+            if self.buffer is not None:
+                self.flush(spider)
+            self.redis_client.close()
+        finally:
+            fingerprints.close('RedisPipeline')
+
+class MongoDBPipeline(IntervalFlushMixin):
     def __init__(self, mongo_settings):
         self.mongo_settings = mongo_settings
+        # A batch size above 1 sends accumulated upserts through one unordered bulk_write
+        batch_size = mongo_settings.get('batch_size', 0)
+        self.buffer = None
+        if batch_size > 1:
+            self.buffer = BatchBuffer(batch_size, mongo_settings.get('batch_interval', 0))
     
     @classmethod
     def from_crawler(cls, crawler):
-        return cls(crawler.settings.get('MONGODB_SETTINGS'))
+        pipeline = cls(crawler.settings.get('MONGODB_SETTINGS'))
+        crawler.signals.connect(pipeline.start_flush_timer, signal=signals.spider_opened)
+        return pipeline
     
     def open_spider(self, spider):
-        self.client = pymongo.MongoClient(
+        self.client = MongoConnector(
             host=self.mongo_settings['host'],
             port=self.mongo_settings['port'],
             username=self.mongo_settings['username'],
-            password=self.mongo_settings['password']
-        )
+            password=self.mongo_settings['password'],
+            backend=self.mongo_settings.get('backend', 'mongodb')
+        ).get_client()
         self.db = self.client[self.mongo_settings['database']]
         self.collection = self.db['jobs']
+        # Incremental exports query by updatedAt
+        self.collection.create_index('updatedAt')
+        # Documents stored before updatedAt existed would never match an export window
+        backfilled = self.collection.update_many(
+            {'updatedAt': {'$exists': False}}, {'$currentDate': {'updatedAt': True}}
+        ).modified_count
+        if backfilled:
+            spider.logger.info(f"Stamped updatedAt on {backfilled} MongoDB documents that had none")
+        fingerprints.register('MongoDBPipeline')
     
+    @timed('pipeline.MongoDBPipeline')
     def process_item(self, item, spider):
         try:
             if not item.get('_id'):
-                spider.logger.error("Missing _id field in item")
+                hot_log.error(spider.logger, "Missing _id field in item")
                 return item
                 
-            item_dict = dict(item)
+            item_dict = item.to_dict()
             
             if 'zipcode' in item_dict and item_dict['zipcode']:
                 try:
                     item_dict['zipcode'] = int(item_dict['zipcode'])
                 except (ValueError, TypeError):
                     item_dict['zipcode'] = None
+
+            if self.buffer is not None:
+                self.buffer.add((
+                    item,
+                    UpdateOne({'_id': item_dict['_id']}, self._update(item_dict), upsert=True)
+                ))
+                if self.buffer.is_full():
+                    self.flush(spider)
+                return item
             
             self.collection.update_one(
                 {'_id': item_dict['_id']},
-                {'$set': item_dict},
+                self._update(item_dict),
                 upsert=True
             )
+            fingerprints.stored('MongoDBPipeline', [item_dict['_id']])
         except Exception as e:
-            spider.logger.error(f"MongoDB error: {str(e)}")
+            registry.record_error('pipeline.MongoDBPipeline')
+            fingerprints.failed([item.get('_id')])
+            hot_log.error(spider.logger, "MongoDB error: %s", e)
+            dead_letters.record('pipeline.MongoDBPipeline', item, e)
         return item
+
+    def _update(self, item_dict):
+        # updatedAt is stamped by the server and drives incremental exports
+        return {'$set': item_dict, '$currentDate': {'updatedAt': True}}
+
+    @timed('flush.MongoDBPipeline')
+    def flush(self, spider):
+        """Send queued upserts in one unordered bulk_write and report per-operation failures"""
+        entries = self.buffer.drain()
+        if not entries:
+            return
+        registry.record_batch('flush.MongoDBPipeline', len(entries))
+
+        operations = [operation for _, operation in entries]
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            fingerprints.stored('MongoDBPipeline', [item['_id'] for item, _ in entries])
+            hot_log.info(
+                spider.logger, "Flushed %d items to MongoDB (%d inserted, %d updated)",
+                len(operations), result.upserted_count, result.modified_count
+            )
+        except BulkWriteError as e:
+            # Unordered writes keep going past failures; log each one that failed
+            registry.record_error('flush.MongoDBPipeline')
+            details = e.details
+            write_errors = details.get('writeErrors', [])
+            hot_log.error(
+                spider.logger, "MongoDB bulk write of %d items had %d failed operations (%d inserted, %d updated)",
+                len(operations), len(write_errors), details.get('nUpserted', 0), details.get('nModified', 0)
+            )
+            failed = {error['index'] for error in write_errors}
+            fingerprints.stored(
+                'MongoDBPipeline', [item['_id'] for index, (item, _) in enumerate(entries) if index not in failed]
+            )
+            fingerprints.failed([entries[index][0]['_id'] for index in failed])
+            for error in write_errors:
+                failed_item = entries[error['index']][0]
+                hot_log.error(spider.logger, "MongoDB error for _id %s: %s", failed_item['_id'], error.get('errmsg'))
+                dead_letters.record('flush.MongoDBPipeline', failed_item, error.get('errmsg'))
+        except Exception as e:
+            registry.record_error('flush.MongoDBPipeline')
+            fingerprints.failed([item['_id'] for item, _ in entries])
+            hot_log.error(spider.logger, "MongoDB error flushing batch of %d items: %s", len(operations), e)
+            dead_letters.record_many('flush.MongoDBPipeline', (item for item, _ in entries), e)
+        self.buffer.mark_flushed()
     
     def close_spider(self, spider):
-        self.client.close()
+        self.stop_flush_timer()
+        try:
+            if self.buffer is not None:
+                self.flush(spider)
+            self.client.close()
+        finally:
+            fingerprints.close('MongoDBPipeline')
+
+class ThreadOffloadMixin:
+    """Runs a blocking pipeline on its own background thread.
+
+    Every hook returns a Deferred, so the reactor keeps parsing while database
+    I/O is in flight. A single thread per pipeline keeps item order and the
+    pipeline's buffers free of races; PIPELINE_MAX_IN_FLIGHT caps how many
+    items may be queued on it before process_item applies back-pressure.
+    """
+    def open_spider(self, spider):
+        from twisted.internet import reactor
+        self.reactor = reactor
+        self.threadpool = ThreadPool(minthreads=1, maxthreads=1, name=type(self).__name__)
+        self.threadpool.start()
+        self.in_flight = DeferredSemaphore(spider.settings.getint('PIPELINE_MAX_IN_FLIGHT', 100))
+        return self._defer(super().open_spider, spider)
+
+    def process_item(self, item, spider):
+        return self.in_flight.run(self._defer, super().process_item, item, spider)
+
+    def flush_due(self, spider):
+        # Timer ticks come from the reactor; the flush runs on the pipeline's thread
+        return self._defer(super().flush_due, spider)
+
+    def close_spider(self, spider):
+        # Stopped on the reactor thread, before the final flush is queued
+        if isinstance(self, IntervalFlushMixin):
+            self.stop_flush_timer()
+        # Queued behind any pending writes, so buffers are flushed last
+        d = self._defer(super().close_spider, spider)
+        d.addBoth(self._stop_threadpool)
+        return d
+
+    def _defer(self, func, *args):
+        return deferToThreadPool(self.reactor, self.threadpool, func, *args)
+
+    def _stop_threadpool(self, result):
+        self.threadpool.stop()
+        return result
+
+class AsyncRedisDedupPipeline(ThreadOffloadMixin, RedisDedupPipeline):
+    pass
+
+class AsyncPostgresPipeline(ThreadOffloadMixin, PostgresPipeline):
+    pass
+
+class AsyncRedisPipeline(ThreadOffloadMixin, RedisPipeline):
+    pass
+
+class AsyncMongoDBPipeline(ThreadOffloadMixin, MongoDBPipeline):
+    pass
@@ -0,0 +1,84 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_YEAR = 40 * 52
+
+# Patterns are listed in priority order: the first pattern that matches
+# anywhere in the description wins, using its first match.
+RANGE_PATTERNS = [
+    r'\$(\d+\.?\d*)\s*per hour to \$(\d+\.?\d*)', # $18.75 per hour to $19.25
+    r'\$(\d+\.?\d*)\s*-\s*\$(\d+\.?\d*)', # $18.75 - $19.25
+    r'\$(\d+\.?\d*)\s*to \$(\d+\.?\d*)', # $18.75 to $19.25
+    r'\$(\d+\.\d+)\s*(?:-|to)\s*\$(\d+\.\d+)\s*(?:\/|per|\s)(?:hour|hr)',  # $17.15-$18.25/hr
+    r'\$(\d+)\s*(?:-|to)\s*\$(\d+)\s*(?:\/|per|\s)(?:hour|hr)',  # $17-$18/hr
+    r'\$(\d+)\s*per hour to \$(\d+\.?\d*)', # $18 per hour to $19.25
+    r'\$(\d+\.?\d*)\s*per hour to \$(\d+)', # $18.75 per hour to $19
+    r'\$(\d+)\s*-\s*\$(\d+\.?\d*)', # $18 - $19.25
+    r'\$(\d+\.?\d*)\s*-\s*\$(\d+)', # $18.75 - $19
+    r'\$(\d+)\s*to \$(\d+\.?\d*)', # $18 to $19.25
+    r'\$(\d+\.?\d*)\s*to \$(\d+)', # $18.75 to $19
+    r'\$(\d+)\s*per hour to \$(\d+)', # $18 per hour to $19
+    r'\$(\d+)\s*-\s*\$(\d+)', # $18 - $19
+    r'\$(\d+)\s*to \$(\d+)', # $18 to $19
+]
+
+SINGLE_PATTERNS = [
+    # More flexible patterns for hourly rates
+    r'(\$\d+\.?\d*)\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*|\s+)\s*h(?:ou)?r(?:s|\b)',  # $18.00 per hour, $17.15/hr
+    r'(\$\d+\.?\d*)\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*|\s+)\s*HR\b',               # $15.50/HR
+    r'(\$\d+\.?\d*)\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*)\s*hour\b',                 # $19.50 an hour
+    r'(\$\d+\.?\d*)\s*-\s*\$\d+\.?\d*\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*)\s*h(?:ou)?r', # $15.50-$18.50/hr
+
+    # Basic dollar amount patterns (only if no hourly indicator found)
+    r'(\$\d+\.\d+)',  # $17.15
+    r'(\$\d+)',       # $17
+
+    r'WAGE:\s*(\d+\.?\d*)\s*per hour',  # WAGE: 20.32 per hour
+    r'WAGE:\s*(\d+)\s*per hour'  # WAGE: 20 per hour
+]
+
+class SalaryExtractor:
+    """Finds an hourly rate in a job description and converts it to an annual salary.
+
+    All patterns are compiled once. The range stage is gated by one combined
+    alternation, so the 14 ordered searches only run when one of them is known
+    to match. The alternation is not used to pick the winner because it prefers
+    the leftmost match, while the rules prefer the earliest pattern.
+    """
+    def __init__(self, range_patterns=RANGE_PATTERNS, single_patterns=SINGLE_PATTERNS):
+        self.range_patterns = [re.compile(pattern) for pattern in range_patterns]
+        self.single_patterns = [re.compile(pattern) for pattern in single_patterns]
+        self.any_range = re.compile('|'.join(f'(?:{pattern})' for pattern in range_patterns))
+
+    def extract(self, description):
+        """Return the annual salary found in ``description``, or None"""
+        # Every pattern needs a '$' once the text is lowercased (the WAGE: ones
+        # are upper case and can never match), so skip normalizing without one
+        if not description or '$' not in description:
+            return None
+
+        description = ' '.join(description.lower().split())
+
+        if self.any_range.search(description):
+            for pattern in self.range_patterns:
+                match = pattern.search(description)
+                if match:
+                    hourly_rate = (float(match.group(1)) + float(match.group(2))) / 2
+                    return self._annualize(hourly_rate, pattern)
+
+        for pattern in self.single_patterns:
+            match = pattern.search(description)
+            if match:
+                hourly_rate = float(match.group(1).replace('$', '').replace(',', ''))
+                return self._annualize(hourly_rate, pattern)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found %d '$' but couldn't extract salary", description.count('$'))
+        return None
+
+    def _annualize(self, hourly_rate, pattern):
+        annual_salary = round(hourly_rate * HOURS_PER_YEAR, 2)
+        logger.debug("Pattern %r: hourly rate $%s/hr -> annual: $%s", pattern.pattern, hourly_rate, annual_salary)
+        return annual_salary
@@ -12,39 +12,141 @@ NEWSPIDER_MODULE = 'jobs_project.spiders'
 # Obey robots.txt rules
 ROBOTSTXT_OBEY = False
 
+# Feed files to ingest
+JSON_INPUT_DIR = os.getenv('JSON_INPUT_DIR', '/app/data')
+JSON_INPUT_GLOB = os.getenv('JSON_INPUT_GLOB', '*.json')
+
+# Parse feed files in this many worker processes (0 = parse in the crawler process)
+JSON_WORKERS = int(os.getenv('JSON_WORKERS', 0))
+# Workers hand items back to the crawler process in chunks of this many jobs
+JSON_WORKER_CHUNK_SIZE = int(os.getenv('JSON_WORKER_CHUNK_SIZE', 1000))
+
+# Stream the jobs array of each feed file record by record instead of
+# loading the whole document (keeps memory bounded for very large feeds)
+JSON_STREAMING = os.getenv('JSON_STREAMING', 'false').lower() == 'true'
+
+# Skip feed files whose size, mtime and content hash match a completed entry in
+# the Redis manifest; partially stored files resume from their last checkpoint
+FEED_MANIFEST_ENABLED = os.getenv('FEED_MANIFEST_ENABLED', 'true').lower() == 'true'
+FEED_MANIFEST_KEY = os.getenv('FEED_MANIFEST_KEY', 'feed_manifest')
+FEED_RESUME = os.getenv('FEED_RESUME', 'true').lower() == 'true'
+FEED_CHECKPOINT_INTERVAL = float(os.getenv('FEED_CHECKPOINT_INTERVAL', 30))
+
+# Archive every raw feed record under RAW_ARCHIVE_DIR (empty disables), partitioned
+# by ingest date and source, as zstd Parquet ('parquet') or zstd JSONL ('jsonl')
+RAW_ARCHIVE_DIR = os.getenv('RAW_ARCHIVE_DIR', '')
+RAW_ARCHIVE_FORMAT = os.getenv('RAW_ARCHIVE_FORMAT', 'parquet')
+RAW_ARCHIVE_BATCH_SIZE = int(os.getenv('RAW_ARCHIVE_BATCH_SIZE', 10000))
+
+# Re-run from the raw archive instead of the feed files, optionally only from an
+# ingest date (YYYY-MM-DD) on and for some sources (comma-separated)
+RAW_ARCHIVE_REPLAY = os.getenv('RAW_ARCHIVE_REPLAY', 'false').lower() == 'true'
+RAW_ARCHIVE_REPLAY_SINCE = os.getenv('RAW_ARCHIVE_REPLAY_SINCE', '')
+RAW_ARCHIVE_REPLAY_SOURCES = os.getenv('RAW_ARCHIVE_REPLAY_SOURCES', '')
+
 # Configure item pipelines
+# ASYNC_PIPELINES runs each storage pipeline on a background thread so parsing
+# and database I/O overlap; PIPELINE_MAX_IN_FLIGHT bounds items queued per pipeline
+ASYNC_PIPELINES = os.getenv('ASYNC_PIPELINES', 'false').lower() == 'true'
+PIPELINE_MAX_IN_FLIGHT = int(os.getenv('PIPELINE_MAX_IN_FLIGHT', 100))
+
+_pipeline_prefix = 'Async' if ASYNC_PIPELINES else ''
 ITEM_PIPELINES = {
-    'jobs_project.pipelines.PostgresPipeline': 300,
-    'jobs_project.pipelines.RedisPipeline': 400,
-    'jobs_project.pipelines.MongoDBPipeline': 500,
+    f'jobs_project.pipelines.{_pipeline_prefix}RedisDedupPipeline': 100,
+    f'jobs_project.pipelines.{_pipeline_prefix}PostgresPipeline': 300,
+    f'jobs_project.pipelines.{_pipeline_prefix}RedisPipeline': 400,
+    f'jobs_project.pipelines.{_pipeline_prefix}MongoDBPipeline': 500,
 }
 
 # Database settings
+# STORAGE_BACKEND=local swaps every service for an in-process stand-in (SQLite,
+# in-memory Redis and MongoDB) so crawls, benchmarks and profiling run without
+# containers; POSTGRES_BACKEND / REDIS_BACKEND / MONGO_BACKEND pick them one by one
+_local_storage = os.getenv('STORAGE_BACKEND', 'services').lower() == 'local'
+
 POSTGRES_SETTINGS = {
+    # 'postgres', or 'sqlite' to write to sqlite_path (a file or :memory:)
+    'backend': os.getenv('POSTGRES_BACKEND') or ('sqlite' if _local_storage else 'postgres'),
+    'sqlite_path': os.getenv('POSTGRES_SQLITE_PATH', ':memory:'),
     'host': os.getenv('POSTGRES_HOST'),
     'port': int(os.getenv('POSTGRES_PORT', 5432)),
     'database': os.getenv('POSTGRES_DB'),
     'user': os.getenv('POSTGRES_USER'),
-    'password': os.getenv('POSTGRES_PASSWORD')
+    'password': os.getenv('POSTGRES_PASSWORD'),
+    # Buffered COPY writes: flush every batch_size items or batch_interval seconds (0/1 = per-item upserts)
+    'batch_size': int(os.getenv('POSTGRES_BATCH_SIZE', 1000)),
+    'batch_interval': float(os.getenv('POSTGRES_BATCH_INTERVAL', 5)),
+    # Build secondary indexes after the load when the jobs table starts out empty
+    'defer_indexes': os.getenv('POSTGRES_DEFER_INDEXES', 'true').lower() == 'true',
+    # Connection pool; min_size connections stay open while idle, checkouts block beyond max_size
+    'pool_min_size': int(os.getenv('POSTGRES_POOL_MIN_SIZE', 1)),
+    'pool_max_size': int(os.getenv('POSTGRES_POOL_MAX_SIZE', 4)),
+    # Connections idle longer than this many seconds are pinged before reuse
+    'idle_check_interval': float(os.getenv('POSTGRES_IDLE_CHECK_INTERVAL', 30)),
+    # Connection attempts, with exponential backoff between them
+    'connect_retries': int(os.getenv('POSTGRES_CONNECT_RETRIES', 5)),
+    # Run per-item upserts as a server-side prepared statement
+    'prepare_statements': os.getenv('POSTGRES_PREPARE_STATEMENTS', 'true').lower() == 'true'
 }
 
 REDIS_SETTINGS = {
+    # 'redis', or 'memory' for an in-process dict with key expiry
+    'backend': os.getenv('REDIS_BACKEND') or ('memory' if _local_storage else 'redis'),
     'host': os.getenv('REDIS_HOST'),
     'port': int(os.getenv('REDIS_PORT', 6379)),
-    'db': int(os.getenv('REDIS_DB', 0))
+    'db': int(os.getenv('REDIS_DB', 0)),
+    'ttl': int(os.getenv('REDIS_TTL', 3600)),
+    'key_prefix': os.getenv('REDIS_KEY_PREFIX', 'job:'),
+    # Pipelined SETEX: flush every batch_size items or batch_interval seconds (0/1 = one call per item)
+    'batch_size': int(os.getenv('REDIS_BATCH_SIZE', 500)),
+    'batch_interval': float(os.getenv('REDIS_BATCH_INTERVAL', 0.5)),
+    # Wrap each flush in MULTI/EXEC
+    'transaction': os.getenv('REDIS_TRANSACTION', 'false').lower() == 'true',
+    # Content fingerprints used to skip unchanged jobs (ttl 0 = keep forever)
+    'fingerprint_prefix': os.getenv('REDIS_FINGERPRINT_PREFIX', 'fingerprint:'),
+    'fingerprint_ttl': int(os.getenv('REDIS_FINGERPRINT_TTL', 0))
 }
 
 MONGODB_SETTINGS = {
+    # 'mongodb', or 'memory' for in-process collections
+    'backend': os.getenv('MONGO_BACKEND') or ('memory' if _local_storage else 'mongodb'),
     'host': os.getenv('MONGO_HOST'),
     'port': int(os.getenv('MONGO_PORT', 27017)),
     'username': os.getenv('MONGO_INITDB_ROOT_USERNAME'),
     'password': os.getenv('MONGO_INITDB_ROOT_PASSWORD'),
-    'database': os.getenv('MONGO_DB')
+    'database': os.getenv('MONGO_DB'),
+    # Unordered bulk_write upserts: flush every batch_size items or batch_interval seconds (0/1 = one call per item)
+    'batch_size': int(os.getenv('MONGO_BATCH_SIZE', 500)),
+    'batch_interval': float(os.getenv('MONGO_BATCH_INTERVAL', 5))
 }
 
+# Per-stage metrics (counts, errors, latency percentiles, batch sizes), published
+# to Scrapy stats at close and to a Prometheus text file every METRICS_DUMP_INTERVAL seconds
+EXTENSIONS = {
+    'jobs_project.hotlog.HotPathLoggingExtension': 490,
+    'jobs_project.metrics.MetricsExtension': 500,
+    'jobs_project.deadletter.DeadLetterExtension': 510,
+}
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_FILE = os.getenv('METRICS_FILE', '/app/logs/metrics.prom')
+METRICS_DUMP_INTERVAL = float(os.getenv('METRICS_DUMP_INTERVAL', 15))
+# Also time each spider.extract_* step (roughly ten more timings per job)
+METRICS_DETAILED = os.getenv('METRICS_DETAILED', 'false').lower() == 'true'
+
+# Items that fail parsing or storage are appended here for replay.py; empty disables
+DEAD_LETTER_FILE = os.getenv('DEAD_LETTER_FILE', '/app/logs/dead_letters.jsonl.gz')
+
 # Logging settings
+LOG_FORMATTER = 'jobs_project.logformatter.JobsLogFormatter'
 LOG_ENABLED = True
 LOG_FILE = '/app/logs/spider.log'
 LOG_LEVEL = 'INFO'
 LOG_FORMAT = '%(asctime)s [%(name)s] %(levelname)s: %(message)s'
 LOG_DATEFORMAT = '%Y-%m-%d %H:%M:%S'
+# 'hotpath' logs only the first and every LOG_SAMPLE_EVERY-th per-item message of each
+# kind (errors at most LOG_RATE_LIMIT times) per LOG_SUMMARY_INTERVAL seconds, logs a
+# summary of the rest, and writes the log file from a background thread
+LOG_MODE = os.getenv('LOG_MODE', 'standard').lower()
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 1000))
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', 10))
+LOG_SUMMARY_INTERVAL = float(os.getenv('LOG_SUMMARY_INTERVAL', 30))
@@ -0,0 +1,102 @@
+import collections
+import multiprocessing
+import threading
+from twisted.internet import defer
+
+# One file's results as the spider consumes them; ``queued`` chunks hold a reader slot
+Chunk = collections.namedtuple('Chunk', 'items failures finished error queued')
+
+class ShardCancelled(Exception):
+    """Raised in a worker process once the crawl process has stopped reading results"""
+
+# Set in each worker process by init_worker
+_results_queue = None
+_stop = None
+
+def init_worker(results_queue, stop):
+    global _results_queue, _stop
+    _results_queue = results_queue
+    _stop = stop
+
+def send_chunk(file_path, items, failures, finished=False, error=None):
+    """Hand one chunk of a file's results to the crawl process; blocks while the queue is full"""
+    if _stop.is_set():
+        raise ShardCancelled(file_path)
+    _results_queue.put((file_path, items, failures, finished, error))
+
+def worker_context():
+    """forkserver where available: forking the crawl process would copy its threads and connections"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+class ShardResults:
+    """Carries item chunks from feed worker processes to the crawl process as they are parsed.
+
+    Workers put chunks on a bounded multiprocessing queue and block while it
+    is full. One reader thread takes chunks off it only while fewer than
+    max_chunks are waiting for the spider, and hands them to the reactor, so
+    memory on both sides is bounded by the chunk size rather than the file
+    size and no reactor thread waits on a worker.
+    """
+    def __init__(self, context, max_chunks):
+        self.queue = context.Queue(max_chunks)
+        self.stop = context.Event()
+        self.slots = threading.Semaphore(max_chunks)
+        self.files = {}
+        self.closing = False
+        self.thread = threading.Thread(target=self.read, name='ShardResults', daemon=True)
+        self.thread.start()
+
+    def worker_args(self):
+        """initargs for init_worker in every process of the pool"""
+        return self.queue, self.stop
+
+    def read(self):
+        from twisted.internet import reactor
+        while True:
+            if not self.closing:
+                self.slots.acquire()
+            message = self.queue.get()
+            if message is None:
+                return
+            # After close, chunks are only drained so blocked workers can see the stop flag
+            if not self.closing:
+                reactor.callFromThread(self.dispatch, message)
+
+    def open(self, file_path):
+        """Start collecting a file's chunks; call before its work is submitted"""
+        self.files[file_path] = defer.DeferredQueue()
+        return self.files[file_path]
+
+    def forget(self, file_path):
+        self.files.pop(file_path, None)
+
+    def dispatch(self, message):
+        file_path, *chunk = message
+        chunks = self.files.get(file_path)
+        if chunks is None:
+            # Left over from a file whose worker already failed
+            self.slots.release()
+            return
+        chunks.put(Chunk(*chunk, queued=True))
+
+    def fail(self, file_path, error):
+        """End a file's chunks when its worker died without reporting the end itself"""
+        chunks = self.files.get(file_path)
+        if chunks is not None:
+            chunks.put(Chunk([], [], True, error, queued=False))
+
+    def consumed(self, chunk):
+        if chunk.queued:
+            self.slots.release()
+
+    def close(self):
+        """Stop every worker at its next chunk; call before shutting the pool down"""
+        self.closing = True
+        self.stop.set()
+        self.slots.release()
+
+    def join(self):
+        """Stop the reader thread once no worker can put anything more"""
+        self.queue.put(None)
+        self.thread.join()
@@ -1,127 +1,331 @@
 import os
-from datetime import datetime
+import glob
+from concurrent.futures import ProcessPoolExecutor
+import itertools
 import re
 import json
 import scrapy
+from scrapy import signals
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import defer
+from infra.job_store import job_id
+from infra.redis_connector import RedisConnector
+from ..archive import RawArchive, archive_files, iter_archive_file
 from ..items import JobItem
+from ..dates import format_feed_date
+from ..deadletter import dead_letters
+from ..hotlog import hot_log
+from ..locations import normalize_city
+from ..manifest import FeedManifest, FeedTracker
+from ..metrics import timed
+from ..salary import SalaryExtractor
+from ..shards import ShardCancelled, ShardResults, init_worker, send_chunk, worker_context
+from ..streaming import iter_json_array
 import logging
 import uuid
 
 class JsonSpider(scrapy.Spider):
     name = 'json_spider'
+    salary_extractor = SalaryExtractor()
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = None
+        self.shard_results = None
+        self.shard_slots = None
+        self.feed_tracker = None
+        self.archive = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Whatever happens to an item, its job is done with as far as the feed manifest is concerned
+        for signal in (signals.item_scraped, signals.item_dropped, signals.item_error):
+            crawler.signals.connect(spider.item_finished, signal=signal)
+        return spider
+
     def start_requests(self):
-        base_dir = '/app/data'
-        files = ['s01.json', 's02.json']
+        if self.settings.getbool('RAW_ARCHIVE_REPLAY'):
+            yield from self.archive_requests()
+            return
+
+        self.archive = open_raw_archive(self.settings)
+        input_dir = self.settings.get('JSON_INPUT_DIR', '/app/data')
+        input_glob = self.settings.get('JSON_INPUT_GLOB', '*.json')
+        files = sorted(glob.glob(os.path.join(input_dir, input_glob)))
+        streaming = self.settings.getbool('JSON_STREAMING')
+        workers = self.settings.getint('JSON_WORKERS')
+
+        planned = [(file_path, None) for file_path in files]
+        self.feed_tracker = self.open_feed_tracker()
+        if self.feed_tracker:
+            planned = self.plan_files(files, resumable=workers <= 0)
+
+        if workers > 0 and planned:
+            workers = min(workers, len(planned))
+            context = worker_context()
+            # Each pending file may hold a couple of chunks in each direction
+            self.shard_results = ShardResults(context, workers * 2)
+            self.shard_slots = defer.DeferredSemaphore(workers * 2)
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=init_worker, initargs=self.shard_results.worker_args()
+            )
+            self.logger.info(f"Sharding {len(planned)} feed files across {workers} worker processes")
         
-        for file in files:
-            file_path = os.path.join(base_dir, file)
+        for file_path, progress in planned:
+            file = os.path.basename(file_path)
+            if self.executor:
+                # Workers parse in parallel; the placeholder request only hands
+                # their chunks back to the pipelines in this process
+                yield scrapy.Request(
+                    url='data:,',
+                    callback=self.parse_shard,
+                    cb_kwargs={'filename': file, 'file_path': file_path, 'progress': progress},
+                    dont_filter=True
+                )
+            elif streaming:
+                # The file is read incrementally in the callback, so only a
+                # placeholder data: URI goes through the downloader
+                yield scrapy.Request(
+                    url='data:,',
+                    callback=self.parse_stream,
+                    cb_kwargs={'filename': file, 'file_path': file_path, 'progress': progress},
+                    dont_filter=True
+                )
+            else:
+                yield scrapy.Request(
+                    url=f'file://{file_path}',
+                    callback=self.parse,
+                    cb_kwargs={'filename': file, 'progress': progress}
+                )
+
+    def archive_requests(self):
+        """Re-run from the raw archive instead of the feed files"""
+        archive_dir = self.settings.get('RAW_ARCHIVE_DIR')
+        sources = [source for source in self.settings.getlist('RAW_ARCHIVE_REPLAY_SOURCES') if source]
+        files = archive_files(archive_dir, self.settings.get('RAW_ARCHIVE_REPLAY_SINCE') or None, sources)
+        self.logger.info(f"Replaying {len(files)} files from the raw archive in {archive_dir}")
+        for source, file_path in files:
             yield scrapy.Request(
-                url=f'file://{file_path}',
-                callback=self.parse,
-                cb_kwargs={'filename': file}
+                url='data:,',
+                callback=self.parse_archive,
+                cb_kwargs={'source': source, 'file_path': file_path},
+                dont_filter=True
+            )
+
+    def open_feed_tracker(self):
+        if not self.settings.getbool('FEED_MANIFEST_ENABLED'):
+            return None
+        redis_settings = self.settings.get('REDIS_SETTINGS')
+        try:
+            connector = RedisConnector(
+                host=redis_settings['host'],
+                port=redis_settings['port'],
+                db=redis_settings['db'],
+                backend=redis_settings.get('backend', 'redis')
             )
+            manifest = FeedManifest(connector.get_client(), self.settings.get('FEED_MANIFEST_KEY', 'feed_manifest'))
+            tracker = FeedTracker(manifest, self.settings.getbool('FEED_RESUME'), self.archive)
+        except Exception as e:
+            self.logger.warning(f"Feed manifest unavailable, parsing every file: {str(e)}")
+            return None
+        tracker.start(self.settings.getfloat('FEED_CHECKPOINT_INTERVAL', 30))
+        return tracker
 
-    def parse(self, response, filename):
+    def plan_files(self, files, resumable):
+        """Drop files the manifest shows as complete and unchanged; resume partial ones"""
+        planned = []
+        skipped = resumed = 0
+        for file_path in files:
+            progress = self.feed_tracker.plan(file_path, resumable)
+            if progress is None:
+                skipped += 1
+                continue
+            if progress.next_index:
+                resumed += 1
+                self.logger.info(f"Resuming {os.path.basename(file_path)} at job {progress.next_index}")
+            planned.append((file_path, progress))
+        self.logger.info(f"Feed manifest: {len(planned)} of {len(files)} files to parse, {skipped} unchanged")
+        self.crawler.stats.set_value('feed_manifest/skipped_files', skipped)
+        self.crawler.stats.set_value('feed_manifest/resumed_files', resumed)
+        return planned
+
+    def item_finished(self, item, **kwargs):
+        if self.feed_tracker:
+            self.feed_tracker.item_finished(item)
+
+    def parse(self, response, filename, progress=None):
         data = json.loads(response.text)
         jobs = data.get('jobs', [])
-        
+        yield from self.parse_jobs(jobs, filename, progress=progress)
+
+    def parse_stream(self, response, filename, file_path, progress=None):
+        """Walk the jobs array one record at a time instead of loading the whole feed"""
+        yield from self.parse_jobs(iter_json_array(file_path, 'jobs'), filename, progress=progress)
+
+    def parse_archive(self, response, source, file_path):
+        # Records archived without an ats_code took the feed name as their source,
+        # so passing the source as the file name derives the same IDs again
+        yield from self.parse_jobs(iter_archive_file(file_path), source)
+
+    async def parse_shard(self, response, filename, file_path, progress=None):
+        """Hand the items a worker process extracts from one feed file to the pipelines, chunk by chunk"""
+        # Files are only submitted while few enough are pending that finished chunks cannot pile up
+        await maybe_deferred_to_future(self.shard_slots.acquire())
+        chunks = self.shard_results.open(file_path)
+        count = 0
+        try:
+            future = self.executor.submit(
+                parse_feed_file, file_path, self.settings.getbool('JSON_STREAMING'),
+                archive_settings(self.settings), self.settings.getint('JSON_WORKER_CHUNK_SIZE', 1000)
+            )
+            future.add_done_callback(lambda future: self.shard_finished(file_path, future))
+            while True:
+                chunk = await maybe_deferred_to_future(chunks.get())
+                for job_raw, error in chunk.failures:
+                    dead_letters.record('spider.build_item', job_raw, error, filename=filename)
+                for item in chunk.items:
+                    if progress is not None:
+                        # Worker files are not resumable, so items stand in for job indexes
+                        progress.track(item, progress.job_started())
+                    yield item
+                count += len(chunk.items)
+                self.shard_results.consumed(chunk)
+                if chunk.finished:
+                    break
+        finally:
+            self.shard_results.forget(file_path)
+            self.shard_slots.release()
+
+        if chunk.error:
+            self.logger.error(f"Worker failed on {filename} after {count} items: {chunk.error}")
+            return
+        self.logger.info(f"Worker finished {filename}: {count} items")
+        if progress is not None:
+            progress.parsed_all = True
+
+    def shard_finished(self, file_path, future):
+        # Runs in the pool's management thread; a worker that returned normally already sent its last chunk
+        if future.cancelled() or future.exception() is None:
+            return
+        from twisted.internet import reactor
+        reactor.callFromThread(self.shard_results.fail, file_path, repr(future.exception()))
+
+    def closed(self, reason):
+        if self.executor:
+            self.shard_results.close()
+            self.executor.shutdown(cancel_futures=True)
+            self.shard_results.join()
+        if self.archive:
+            self.archive.close()
+            self.crawler.stats.set_value('raw_archive/records', self.archive.records)
+            self.crawler.stats.set_value('raw_archive/files', self.archive.parts)
+        if self.feed_tracker:
+            # The pipelines have flushed by now, so this records exactly what was stored
+            self.feed_tracker.close()
+
+        cache = normalize_city.cache_info()
+        self.crawler.stats.set_value('city_cache/hits', cache.hits)
+        self.crawler.stats.set_value('city_cache/misses', cache.misses)
+        self.crawler.stats.set_value('city_cache/size', cache.currsize)
+
+    def parse_jobs(self, jobs, filename, failures=None, progress=None):
+        if progress is not None and progress.next_index:
+            # Jobs before the resume point were stored by an earlier run
+            jobs = itertools.islice(jobs, progress.next_index, None)
+
         for job_raw in jobs:
+            index = None if progress is None else progress.job_started()
+            if self.archive is not None:
+                self.archive.add(job_raw, filename, raw_source(job_raw, filename))
+            item = None
             try:
-                # Get the data field which contains most job information
-                job_data = job_raw.get('data', {})
-                if not job_data:
-                    continue
-                    
-                item = JobItem()
-                item['_id'] = str(uuid.uuid4())
-                
-                # Extract data using dedicated functions
-                item['correctDate'] = self.extract_date(job_raw)
-                item['companyName'] = self.extract_company(job_data)
-                item['annualSalaryAvg'] = self.extract_salary(job_data)
-                item['jobKey'] = self.extract_job_key(job_data)
-                item['jobPageUrl'] = self.extract_job_url(job_data)
-                item['city'] = self.extract_city(job_data)
-                item['zipcode'] = self.extract_zipcode(job_data)
-                
-                yield item
-                
+                item = self.build_item(job_raw, filename)
             except Exception as e:
-                self.logger.error(f"Error parsing job data: {str(e)}")
+                hot_log.error(self.logger, "Error parsing job data: %s", e)
+                if failures is None:
+                    dead_letters.record('spider.build_item', job_raw, e, filename=filename)
+                else:
+                    # Worker processes hand failures back instead of writing the file themselves
+                    failures.append((job_raw, str(e)))
+
+            if item is None:
+                if progress is not None:
+                    progress.job_finished(index)
                 continue
+            if progress is not None:
+                progress.track(item, index)
+            yield item
+
+        if progress is not None:
+            progress.parsed_all = True
+
+    @timed('spider.build_item')
+    def build_item(self, job_raw, filename):
+        # Get the data field which contains most job information
+        job_data = job_raw.get('data', {})
+        if not job_data:
+            return None
+            
+        source = self.extract_source(job_data, filename)
+        
+        # Extract data using dedicated functions
+        return JobItem(
+            _id=self.extract_id(job_data, source),
+            source=source,
+            correctDate=self.extract_date(job_raw),
+            companyName=self.extract_company(job_data),
+            annualSalaryAvg=self.extract_salary(job_data),
+            jobKey=self.extract_job_key(job_data),
+            jobPageUrl=self.extract_job_url(job_data),
+            city=self.extract_city(job_data),
+            zipcode=self.extract_zipcode(job_data)
+        )
 
-    def extract_id(self):
-        """Generate unique ID for job listing"""
-        return str(uuid.uuid4())
+    @timed('spider.extract_source', detail=True)
+    def extract_source(self, job_data, filename):
+        """The ATS feed identifies the source; fall back to the feed file name"""
+        return job_data.get('ats_code') or filename
 
+    @timed('spider.extract_id', detail=True)
+    def extract_id(self, job_data, source):
+        """Derive a stable ID for the job listing from its source and req_id"""
+        req_id = job_data.get('req_id')
+        if not req_id:
+            return str(uuid.uuid4())
+        return job_id(source, req_id)
+
+    @timed('spider.extract_city', detail=True)
     def extract_city(self, job_data):
         """Extract and normalize city name from job data"""
-        # Try full_location first
+        # Try full_location ("City, State") first, then the direct city field
+        city = None
         location = job_data.get('full_location', '')
-        if location:
-            parts = location.split(',')
-            if len(parts) >= 2:
-                city = parts[0].strip()
-        else:
-            # Try direct city field as fallback
-            city = job_data.get('city', '')
+        if location and ',' in location:
+            city = location.split(',', 1)[0].strip()
+        if not city:
+            city = (job_data.get('city') or '').strip()
         
         if not city:
             return None
         
-        # Normalize the city name
-        city = city.strip()
-        
-        # Convert to title case while preserving special cases
-        words = city.lower().split()
-        normalized_words = []
-        
-        for i, word in enumerate(words):
-            # Special case for French "en" and "la"
-            if word in ["en", "la"] and i != 0:
-                normalized_words.append(word.lower())
-                continue
-            
-            # Special case for directionals in multi-word cities
-            if word in ["north", "south", "east", "west"] and i == 0:
-                normalized_words.append(word.title())
-                continue
-            
-            # Special case for Saint/St.
-            if word in ["saint", "st", "st."]:
-                normalized_words.append("St.")
-                continue
-            
-            # Special case for Mc surnames
-            if word.startswith("mc"):
-                normalized_words.append("Mc" + word[2:].title())
-                continue
-            
-            # Special case for CDG (airport code)
-            if word.lower() == "cdg":
-                normalized_words.append("CDG")
-                continue
-            
-            # Default case
-            normalized_words.append(word.title())
-        
-        return " ".join(normalized_words)
+        return normalize_city(city)
 
+    @timed('spider.extract_date', detail=True)
     def extract_date(self, job_raw):
         """Extract and format the job posting date"""
         job_data = job_raw.get('data', {})
         date_str = job_data.get('create_date')
         if date_str:
             try:
-                # Parse ISO format date string
-                date_obj = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S%z")
                 # Format to match database format: YYYY-MM-DD HH:MM:SS
-                return date_obj.strftime("%Y-%m-%d %H:%M:%S")
+                return format_feed_date(date_str)
             except (ValueError, TypeError) as e:
-                self.logger.error(f"Error parsing date: {e}")
+                hot_log.error(self.logger, "Error parsing date: %s", e)
         return None
 
+    @timed('spider.extract_company', detail=True)
     def extract_company(self, job_data):
         # Try hiring_organization first
         company = job_data.get('hiring_organization')
@@ -135,6 +339,7 @@ class JsonSpider(scrapy.Spider):
         
         return "Unknown Company"
 
+    @timed('spider.extract_salary', detail=True)
     def extract_salary(self, job_data):
         """Extract and normalize salary information from job data"""
         # First try to get salary from salary fields
@@ -150,86 +355,13 @@ class JsonSpider(scrapy.Spider):
             return avg_salary * 40 * 52  # Convert to annual salary
         
         # If no salary range, try to extract from description
-        description = job_data.get('description', '')
-        if not description:
-            return None
-        
-        description = ' '.join(description.lower().split())
-
-        # Common patterns for hourly wages
-        min_max_patterns = [
-            r'\$(\d+\.?\d*)\s*per hour to \$(\d+\.?\d*)', # $18.75 per hour to $19.25
-            r'\$(\d+\.?\d*)\s*-\s*\$(\d+\.?\d*)', # $18.75 - $19.25
-            r'\$(\d+\.?\d*)\s*to \$(\d+\.?\d*)', # $18.75 to $19.25
-            r'\$(\d+\.\d+)\s*(?:-|to)\s*\$(\d+\.\d+)\s*(?:\/|per|\s)(?:hour|hr)',  # $17.15-$18.25/hr
-            r'\$(\d+)\s*(?:-|to)\s*\$(\d+)\s*(?:\/|per|\s)(?:hour|hr)',  # $17-$18/hr
-            r'\$(\d+)\s*per hour to \$(\d+\.?\d*)', # $18 per hour to $19.25
-            r'\$(\d+\.?\d*)\s*per hour to \$(\d+)', # $18.75 per hour to $19
-            r'\$(\d+)\s*-\s*\$(\d+\.?\d*)', # $18 - $19.25
-            r'\$(\d+\.?\d*)\s*-\s*\$(\d+)', # $18.75 - $19
-            r'\$(\d+)\s*to \$(\d+\.?\d*)', # $18 to $19.25
-            r'\$(\d+\.?\d*)\s*to \$(\d+)', # $18.75 to $19
-            r'\$(\d+)\s*per hour to \$(\d+)', # $18 per hour to $19
-            r'\$(\d+)\s*-\s*\$(\d+)', # $18 - $19
-            r'\$(\d+)\s*to \$(\d+)', # $18 to $19
-        ]
-        single_patterns = [
-            # More flexible patterns for hourly rates
-            r'(\$\d+\.?\d*)\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*|\s+)\s*h(?:ou)?r(?:s|\b)',  # $18.00 per hour, $17.15/hr
-            r'(\$\d+\.?\d*)\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*|\s+)\s*HR\b',               # $15.50/HR
-            r'(\$\d+\.?\d*)\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*)\s*hour\b',                 # $19.50 an hour
-            r'(\$\d+\.?\d*)\s*-\s*\$\d+\.?\d*\s*(?:\/|\s*\/\s*|\s+per\s*|\s+an\s*)\s*h(?:ou)?r', # $15.50-$18.50/hr
-
-            # Basic dollar amount patterns (only if no hourly indicator found)
-            r'(\$\d+\.\d+)',  # $17.15
-            r'(\$\d+)',       # $17
-            
-            r'WAGE:\s*(\d+\.?\d*)\s*per hour',  # WAGE: 20.32 per hour
-            r'WAGE:\s*(\d+)\s*per hour'  # WAGE: 20 per hour
-        ]
-        
-        # First try min max range patterns
-        for pattern in min_max_patterns:
-            matches = re.findall(pattern, description)
-            
-            if matches:
-                self.logger.info(f"Range pattern '{pattern}' found matches: {matches}")
-
-                try:
-                    min_rate = float(matches[0][0])
-                    max_rate = float(matches[0][1])
-                    hourly_rate = (min_rate + max_rate) / 2
-                    annual_salary = round(hourly_rate * 40 * 52, 2)
-                    self.logger.info(f"Found range hourly rate: ${hourly_rate}/hr -> annual: ${annual_salary}")
-                    return annual_salary
-                except (ValueError, TypeError) as e:
-                    self.logger.info(f"Failed to parse range values: {matches[0]} - Error: {e}")
-                    continue
-
-        # Then try single value patterns
-        for pattern in single_patterns:
-            matches = re.findall(pattern, description)
-            if matches:
-                self.logger.info(f"Pattern '{pattern}' found matches: {matches}")
-                try:
-                    hourly_rate = float(matches[0].replace('$', '').replace(',', ''))
-                    annual_salary = round(hourly_rate * 40 * 52, 2)
-                    self.logger.info(f"Found single value hourly rate: ${hourly_rate}/hr -> annual: ${annual_salary}")
-                    return annual_salary
-                except (ValueError, TypeError) as e:
-                    self.logger.info(f"Failed to parse single value: {matches[0]} - Error: {e}")
-                    continue
-        
-        # If no matches found, log with better dollar amount detection
-        all_amounts = re.findall(r'\$', description)
-        if all_amounts:
-            self.logger.info(f"Found $ but couldn't extract salary. Dollar amounts found: {['$' + amt for amt in all_amounts]}. Description: {description}")
-        
-        return None
+        return self.salary_extractor.extract(job_data.get('description', ''))
 
+    @timed('spider.extract_job_key', detail=True)
     def extract_job_key(self, job_data):
         return job_data.get('req_id')
     
+    @timed('spider.extract_job_url', detail=True)
     def extract_job_url(self, job_data):
         """Extract job page URL from various possible locations in the data"""
         meta_data = job_data.get('meta_data', {})
@@ -241,6 +373,7 @@ class JsonSpider(scrapy.Spider):
         
         return url if url else None
     
+    @timed('spider.extract_zipcode', detail=True)
     def extract_zipcode(self, job_data):
         """Extract and validate zipcode from job data"""
         try:
@@ -275,6 +408,64 @@ class JsonSpider(scrapy.Spider):
             return None
             
         except (ValueError, TypeError) as e:
-            self.logger.error(f"Error extracting zipcode: {e}")
+            hot_log.error(self.logger, "Error extracting zipcode: %s", e)
             return None
 
+def raw_source(job_raw, filename):
+    """The source a raw record is archived under, as extract_source would derive it"""
+    job_data = job_raw.get('data') if isinstance(job_raw, dict) else None
+    return (job_data or {}).get('ats_code') or filename
+
+def archive_settings(settings):
+    """The raw archive settings as a plain dict, so they can be handed to worker processes"""
+    if not settings.get('RAW_ARCHIVE_DIR'):
+        return None
+    return {
+        'base_dir': settings.get('RAW_ARCHIVE_DIR'),
+        'format': settings.get('RAW_ARCHIVE_FORMAT', 'parquet'),
+        'batch_size': settings.getint('RAW_ARCHIVE_BATCH_SIZE', 10000),
+    }
+
+def open_raw_archive(settings):
+    options = archive_settings(settings)
+    return RawArchive(**options) if options else None
+
+def parse_feed_file(file_path, streaming=False, archive_options=None, chunk_size=1000):
+    """Run the spider's extraction over one feed file inside a worker process.
+
+    Items and the (raw job, error) pairs that failed to parse are sent to the
+    crawl process in chunks of about chunk_size as they are extracted, the
+    last one marked finished and carrying the error that stopped the file, if
+    any. Returns the item count. Raw records are archived by the worker itself
+    when archive_options is set.
+    """
+    spider = JsonSpider()
+    if archive_options:
+        spider.archive = RawArchive(**archive_options)
+    items = []
+    failures = []
+    count = 0
+    error = None
+    try:
+        if streaming:
+            jobs = iter_json_array(file_path, 'jobs')
+        else:
+            with open(file_path, encoding='utf-8') as f:
+                jobs = json.load(f).get('jobs', [])
+        for item in spider.parse_jobs(jobs, os.path.basename(file_path), failures):
+            items.append(item)
+            if len(items) + len(failures) >= chunk_size:
+                # Slotted items pickle compactly on the way back to the crawl process
+                send_chunk(file_path, items, list(failures))
+                count += len(items)
+                items = []
+                failures.clear()
+    except ShardCancelled:
+        raise
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if spider.archive:
+            spider.archive.close()
+    send_chunk(file_path, items, list(failures), finished=True, error=error)
+    return count + len(items)
@@ -0,0 +1,95 @@
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+class JsonArrayReader:
+    """Incrementally yields the elements of one array in a top-level JSON object.
+
+    Only the current element (plus one read chunk) is held in memory, so peak
+    usage is bounded by the largest record rather than by the file size.
+    """
+
+    def __init__(self, fp, key, chunk_size=64 * 1024):
+        self.fp = fp
+        self.key = key
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Read the next chunk, dropping the already consumed part of the buffer"""
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return
+
+    def _expect(self, chars):
+        self._skip_whitespace()
+        if self.pos >= len(self.buf):
+            raise ValueError(f"Unexpected end of JSON input, expected one of {chars!r}")
+        char = self.buf[self.pos]
+        if char not in chars:
+            raise ValueError(f"Unexpected {char!r} at offset {self.pos}, expected one of {chars!r}")
+        self.pos += 1
+        return char
+
+    def _decode_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number cut at the buffer edge may continue in the next chunk
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def __iter__(self):
+        self._expect('{')
+        if self._expect('}"') == '}':
+            return
+        self.pos -= 1
+
+        while True:
+            key = self._decode_value()
+            self._expect(':')
+            if key == self.key:
+                yield from self._iter_array()
+                return
+            # Sibling keys are decoded and discarded
+            self._decode_value()
+            if self._expect(',}') == '}':
+                return
+
+    def _iter_array(self):
+        self._expect('[')
+        self._skip_whitespace()
+        if self.buf[self.pos:self.pos + 1] == ']':
+            self.pos += 1
+            return
+
+        while True:
+            yield self._decode_value()
+            if self._expect(',]') == ']':
+                return
+
+def iter_json_array(path, key, chunk_size=64 * 1024):
+    """Stream the elements of ``key`` from the JSON object stored at ``path``"""
+    with open(path, encoding='utf-8') as fp:
+        yield from JsonArrayReader(fp, key, chunk_size)
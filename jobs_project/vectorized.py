@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from infra.job_store import job_id
+from .dates import format_feed_date
+from .locations import normalize_city
+from .salary import HOURS_PER_YEAR, SalaryExtractor
+
+# Raw feed fields the column-wise extractors read, one column per field
+RAW_COLUMNS = (
+    'source', 'req_id', 'create_date', 'salary_value', 'salary_min_value', 'salary_max_value',
+    'description', 'full_location', 'city', 'postal_code'
+)
+
+# Feed timestamps in the YYYY-MM-DDTHH:MM:SS+HHMM shape format_feed_date slices
+FEED_DATE_SHAPE = r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-](?:[01]\d|2[0-3])[0-5]\d'
+
+def raw_record(job_raw, filename):
+    """Flatten one feed job into the RAW_COLUMNS the frame extractors work on"""
+    job_data = job_raw.get('data') or {}
+    if 'postal_code' in job_data:
+        postal_code = job_data['postal_code']
+    else:
+        # Same fallback as JsonSpider.extract_zipcode
+        locations = (job_data.get('meta_data', {}).get('googlejobs', {})
+                     .get('derivedInfo', {}).get('locations', []))
+        postal_code = locations[0].get('postalAddress', {}).get('postalCode') if locations else None
+    return (
+        job_data.get('ats_code') or filename,
+        job_data.get('req_id'),
+        job_data.get('create_date'),
+        job_data.get('salary_value'),
+        job_data.get('salary_min_value'),
+        job_data.get('salary_max_value'),
+        job_data.get('description'),
+        job_data.get('full_location'),
+        job_data.get('city'),
+        postal_code,
+    )
+
+def raw_frame(jobs, filename):
+    return pd.DataFrame.from_records([raw_record(job_raw, filename) for job_raw in jobs], columns=RAW_COLUMNS)
+
+def _strings(series):
+    """The column as objects, with anything but a non-empty string masked out"""
+    series = series.astype(object)
+    return series.where(series.map(lambda value: isinstance(value, str) and bool(value)))
+
+def _normalize_text(text):
+    # Same lower-casing and whitespace folding as SalaryExtractor.extract
+    return ' '.join(text.lower().split())
+
+def _none_where_missing(series):
+    return series.astype(object).where(series.notna(), None)
+
+def extract_ids(frame):
+    """Job IDs as JsonSpider.extract_id derives them; None where there is no req_id"""
+    return pd.Series([
+        job_id(source, req_id) if req_id else None
+        for source, req_id in zip(frame['source'], frame['req_id'])
+    ], index=frame.index, dtype=object)
+
+def extract_salaries(frame, extractor=None):
+    """Annual salaries for a frame of raw jobs, matching JsonSpider.extract_salary.
+
+    Salary fields win over the description. Descriptions run through the
+    extractor's compiled patterns with str.extract, one pattern at a time over
+    only the rows no earlier pattern resolved, so priority order is kept.
+    """
+    extractor = extractor or SalaryExtractor()
+    value = pd.to_numeric(frame['salary_value'], errors='coerce').fillna(0)
+    low = pd.to_numeric(frame['salary_min_value'], errors='coerce').fillna(0)
+    high = pd.to_numeric(frame['salary_max_value'], errors='coerce').fillna(0)
+
+    salary = pd.Series(np.nan, index=frame.index, dtype='float64')
+    from_range = (low != 0) & (high != 0)
+    # Same operation order as extract_salary (avg * 40 * 52), so the floats come out bit-identical
+    salary.loc[from_range] = (low[from_range] + high[from_range]) / 2 * 40 * 52
+    salary.loc[value != 0] = value[value != 0] * 40 * 52
+
+    descriptions = _strings(frame['description']).where(salary.isna())
+    descriptions = descriptions[descriptions.str.contains('$', regex=False, na=False)]
+    text = descriptions.map(_normalize_text)
+
+    # The combined alternation gates the ordered range patterns, as in extract
+    unresolved = text[text.map(extractor.any_range.search).notna()]
+    for pattern in extractor.range_patterns:
+        if unresolved.empty:
+            break
+        match = unresolved.str.extract(pattern).dropna()
+        rate = (match[0].astype(float) + match[1].astype(float)) / 2
+        salary.loc[match.index] = (rate * HOURS_PER_YEAR).round(2)
+        unresolved = unresolved.drop(match.index)
+
+    unresolved = text[salary[text.index].isna()]
+    for pattern in extractor.single_patterns:
+        if unresolved.empty:
+            break
+        match = unresolved.str.extract(pattern)[0].dropna()
+        rate = match.str.replace('$', '', regex=False).str.replace(',', '', regex=False).astype(float)
+        salary.loc[match.index] = (rate * HOURS_PER_YEAR).round(2)
+        unresolved = unresolved.drop(match.index)
+
+    return _none_where_missing(salary)
+
+def extract_cities(frame):
+    """Normalized cities, matching JsonSpider.extract_city.
+
+    Raw names are factorized so normalize_city runs once per distinct name
+    and the results are mapped back by category code.
+    """
+    location = _strings(frame['full_location'])
+    location = location.where(location.str.contains(',', regex=False, na=False))
+    city = location.str.split(',', n=1).str[0].str.strip()
+    fallback = _strings(frame['city']).str.strip()
+    city = city.where(city.str.len() > 0, fallback)
+    city = city.where(city.str.len() > 0)
+
+    codes, names = pd.factorize(city)
+    normalized = np.array([normalize_city(name) for name in names] + [None], dtype=object)
+    # Missing values get code -1, which indexes the trailing None
+    return pd.Series(normalized[codes], index=frame.index, dtype=object)
+
+def extract_zipcodes(frame):
+    """5-digit US zipcodes, matching JsonSpider.extract_zipcode"""
+    postal_code = _strings(frame['postal_code'])
+    # Canadian postal codes contain letters
+    postal_code = postal_code.where(~postal_code.str.contains(r'[A-Za-z]', na=False))
+    return _none_where_missing(postal_code.str.extract(r'^(\d{5})')[0])
+
+def extract_dates(frame):
+    """Formatted posting dates, matching JsonSpider.extract_date.
+
+    Feed-shaped timestamps are validated and sliced as whole columns; any
+    other value goes through format_feed_date one row at a time.
+    """
+    raw = _strings(frame['create_date'])
+    shaped = raw.str.fullmatch(FEED_DATE_SHAPE, na=False)
+    parsed = pd.to_datetime(raw.where(shaped).str.slice(0, 19), format='%Y-%m-%dT%H:%M:%S', errors='coerce')
+    fast = shaped & parsed.notna()
+
+    dates = (raw.str.slice(0, 10) + ' ' + raw.str.slice(11, 19)).where(fast)
+    for index, value in raw[~fast & raw.notna()].items():
+        try:
+            dates.loc[index] = format_feed_date(value)
+        except (ValueError, TypeError):
+            pass
+    return _none_where_missing(dates)
+
+# Derived columns the backfill can rewrite, with the extractor that produces each
+EXTRACTORS = {
+    'annualSalaryAvg': extract_salaries,
+    'city': extract_cities,
+    'zipcode': extract_zipcodes,
+    'correctDate': extract_dates,
+}
@@ -1,15 +1,120 @@
 import pandas as pd
 import psycopg2
 import pymongo
-from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import argparse
+import csv
+import json
 import os
-from sqlalchemy import create_engine
+import shutil
+import uuid
+from sqlalchemy import URL, create_engine
+from infra.job_cache import JobCache
+from infra.postgresql_connector import PostgresConnector
+from infra.redis_connector import RedisConnector
+
+JOB_FIELDS = [
+    '_id', 'companyName', 'correctDate', 'jobKey', 'source',
+    'jobPageUrl', 'annualSalaryAvg', 'city', 'zipcode'
+]
+
+POSTGRES_PARQUET_SCHEMA = pa.schema([
+    ('_id', pa.string()),
+    ('companyName', pa.string()),
+    ('correctDate', pa.timestamp('us')),
+    ('jobKey', pa.string()),
+    ('source', pa.string()),
+    ('jobPageUrl', pa.string()),
+    ('annualSalaryAvg', pa.float64()),
+    ('city', pa.string()),
+    ('zipcode', pa.string())
+])
+
+# MongoDB keeps correctDate as the spider's formatted string and zipcode as an integer
+MONGODB_PARQUET_SCHEMA = (
+    POSTGRES_PARQUET_SCHEMA
+    .set(2, pa.field('correctDate', pa.string()))
+    .set(8, pa.field('zipcode', pa.int64()))
+)
+
+# Quoted aliases keep the camelCase names that MongoDB uses
+JOBS_SELECT = """
+    SELECT
+        _id::text AS _id,
+        companyName AS "companyName",
+        correctDate AS "correctDate",
+        jobKey AS "jobKey",
+        source,
+        jobPageUrl AS "jobPageUrl",
+        annualSalaryAvg::float8 AS "annualSalaryAvg",
+        city,
+        zipcode
+    FROM jobs
+    {where}
+"""
+STREAM_QUERY = JOBS_SELECT + "    ORDER BY correctDate DESC\n"
+
+# Per-source high-water marks of updatedAt, kept next to the exports
+WATERMARK_FILE = 'export_watermarks.json'
+
+def id_ranges(shards):
+    """Split the _id key space into ``shards`` [lower, upper) ranges; None leaves an end open.
+
+    Job IDs are UUIDs derived from hashes (or random ones), so equal slices of
+    the key space hold about as many rows each. Lowercase hex strings sort
+    like the UUIDs themselves, so the same bounds work in both databases.
+    """
+    bounds = [str(uuid.UUID(int=(index << 128) // shards)) for index in range(1, shards)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+def postgres_filters(since=None, until=None, id_range=None):
+    """WHERE clause and parameters for an optional updatedAt window and _id range"""
+    conditions = []
+    params = []
+    if since:
+        conditions.append("updatedAt > %s")
+        params.append(since)
+    if until:
+        conditions.append("updatedAt <= %s")
+        params.append(until)
+    lower, upper = id_range or (None, None)
+    if lower:
+        conditions.append("_id >= %s::uuid")
+        params.append(lower)
+    if upper:
+        conditions.append("_id < %s::uuid")
+        params.append(upper)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+def concat_parts(part_bases, base_filename, schema, formats):
+    """Join shard part files, in shard order, into one file per format and delete the parts"""
+    if 'csv' in formats:
+        with open(f"{base_filename}.csv", 'wb') as out:
+            out.write((','.join(JOB_FIELDS) + '\n').encode())
+            for part in part_bases:
+                with open(f"{part}.csv", 'rb') as f:
+                    shutil.copyfileobj(f, out)
+                os.remove(f"{part}.csv")
+    if 'parquet' in formats:
+        with pq.ParquetWriter(f"{base_filename}.parquet", schema, compression='snappy') as writer:
+            for part in part_bases:
+                part_file = pq.ParquetFile(f"{part}.parquet")
+                # Row groups are copied one at a time, so memory stays at one chunk
+                for index in range(part_file.num_row_groups):
+                    writer.write_table(part_file.read_row_group(index))
+                part_file.close()
+                os.remove(f"{part}.parquet")
 
 class DatabaseQuery:
-    def __init__(self, postgres_settings, mongodb_settings=None):
+    def __init__(self, postgres_settings, mongodb_settings=None, pool_size=5):
         self.postgres_settings = postgres_settings
         self.mongodb_settings = mongodb_settings
+        self.pool_size = pool_size
         self.pg_conn = None
+        self.engine = None
         self.mongo_client = None
         
         # Initialize connections
@@ -50,23 +155,34 @@ class DatabaseQuery:
             print(f"MongoDB connection error: {str(e)}")
             self.mongo_client = None
     
+    def get_engine(self):
+        """The SQLAlchemy engine, created once; its pool serves every query and export shard"""
+        if self.engine is None:
+            self.engine = create_engine(
+                URL.create(
+                    'postgresql+psycopg2',
+                    username=self.postgres_settings['user'],
+                    password=self.postgres_settings['password'],
+                    host=self.postgres_settings['host'],
+                    port=self.postgres_settings['port'],
+                    database=self.postgres_settings['database']
+                ),
+                pool_size=self.pool_size,
+                max_overflow=0,
+                # Shards beyond the pool size wait for a connection instead of failing
+                pool_timeout=None,
+                pool_pre_ping=True
+            )
+        return self.engine
+
     def get_postgres_data(self):
-        if not self.pg_conn:
-            self.connect_postgres()
-            
-        # Create SQLAlchemy engine from existing connection
-        engine = create_engine(
-            f'postgresql://{self.postgres_settings["user"]}:{self.postgres_settings["password"]}@'
-            f'{self.postgres_settings["host"]}:{self.postgres_settings["port"]}/'
-            f'{self.postgres_settings["database"]}'
-        )
-        
         query = """
             SELECT 
                 _id,
                 companyName,
                 correctDate,
                 jobKey,
+                source,
                 jobPageUrl,
                 annualSalaryAvg,
                 city,
@@ -75,7 +191,7 @@ class DatabaseQuery:
             ORDER BY correctDate DESC
         """
         
-        return pd.read_sql_query(query, engine)
+        return pd.read_sql_query(query, self.get_engine())
     
     def get_mongodb_data(self):
         if not self.mongo_client:
@@ -118,7 +234,8 @@ class DatabaseQuery:
             print(f"PostgreSQL data exported to {pg_filename}")
             print(f"Total PostgreSQL records: {len(pg_df)}")
         
-        # Get MongoDB data if available
+        # Get MongoDB data if available; loaded after PostgreSQL so only one
+        # whole table is held in memory at a time (--parallel runs both at once)
         mongo_df = self.get_mongodb_data()
         if mongo_df is not None and not mongo_df.empty:
             # Keep the _id field as it matches PostgreSQL's primary key
@@ -127,15 +244,295 @@ class DatabaseQuery:
             print(f"MongoDB data exported to {mongo_filename}")
             print(f"Total MongoDB records: {len(mongo_df)}")
     
+    def stream_postgres_data(self, chunk_size=10000, since=None, until=None, id_range=None, conn=None):
+        """Yield lists of job rows from a server-side cursor, chunk_size rows at a time.
+
+        An id_range shard is read unsorted, on ``conn`` when given so that
+        shards can run side by side on connections of their own.
+        """
+        if conn is None:
+            if not self.pg_conn:
+                self.connect_postgres()
+            conn = self.pg_conn
+
+        # Optional updatedAt window for incremental exports and _id range for parallel shards
+        where, params = postgres_filters(since, until, id_range)
+        query = (STREAM_QUERY if id_range is None else JOBS_SELECT).format(where=where)
+
+        try:
+            # A named cursor keeps the result set on the server instead of in client memory
+            with conn.cursor(name='jobs_export') as cur:
+                cur.itersize = chunk_size
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            # End the read transaction the named cursor opened
+            conn.rollback()
+
+    def stream_mongodb_data(self, chunk_size=10000, since=None, until=None, id_range=None):
+        """Yield lists of job rows from a batched MongoDB cursor, chunk_size rows at a time"""
+        if not self.mongo_client:
+            self.connect_mongodb()
+
+        if not self.mongo_client:
+            print("No MongoDB connection available")
+            return
+
+        collection = self.mongo_client[self.mongodb_settings['database']]['jobs']
+        query = {}
+        if since or until:
+            query['updatedAt'] = {}
+            if since:
+                query['updatedAt']['$gt'] = since
+            if until:
+                query['updatedAt']['$lte'] = until
+            if not since:
+                # A first run also takes documents stored before updatedAt existed
+                query['$or'] = [{'updatedAt': query.pop('updatedAt')}, {'updatedAt': {'$exists': False}}]
+        lower, upper = id_range or (None, None)
+        if lower or upper:
+            query['_id'] = {}
+            if lower:
+                query['_id']['$gte'] = lower
+            if upper:
+                query['_id']['$lt'] = upper
+        cursor = collection.find(query, projection={field: 1 for field in JOB_FIELDS}).batch_size(chunk_size)
+
+        rows = []
+        for document in cursor:
+            rows.append(tuple(document.get(field) for field in JOB_FIELDS))
+            if len(rows) >= chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+    def copy_postgres_csv(self, filename, id_range=None, conn=None):
+        """Export the jobs table to CSV with COPY ... TO STDOUT, streamed straight to disk.
+
+        An id_range shard is written unsorted and without a header, ready to be concatenated.
+        """
+        if conn is None:
+            if not self.pg_conn:
+                self.connect_postgres()
+            conn = self.pg_conn
+
+        with open(filename, 'w', newline='') as f, conn.cursor() as cur:
+            if id_range is None:
+                cur.copy_expert(f"COPY ({STREAM_QUERY.format(where='')}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+            else:
+                where, params = postgres_filters(id_range=id_range)
+                # COPY takes no bind parameters, so the query is rendered client-side first
+                query = cur.mogrify(JOBS_SELECT.format(where=where), params).decode()
+                cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", f)
+        conn.commit()
+
+    def write_chunks(self, chunks, base_filename, schema, formats=('csv', 'parquet'), header=True):
+        """Write row chunks to CSV and/or Parquet incrementally, one chunk in memory at a time"""
+        csv_file = None
+        parquet_writer = None
+        total = 0
+        try:
+            if 'csv' in formats:
+                csv_file = open(f"{base_filename}.csv", 'w', newline='')
+                csv_writer = csv.writer(csv_file)
+                if header:
+                    csv_writer.writerow(JOB_FIELDS)
+            if 'parquet' in formats:
+                parquet_writer = pq.ParquetWriter(f"{base_filename}.parquet", schema, compression='snappy')
+
+            for rows in chunks:
+                if csv_file:
+                    csv_writer.writerows(rows)
+                if parquet_writer:
+                    # Each chunk becomes one Parquet row group
+                    columns = list(zip(*rows))
+                    parquet_writer.write_table(pa.Table.from_arrays(
+                        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                        schema=schema
+                    ))
+                total += len(rows)
+        finally:
+            if csv_file:
+                csv_file.close()
+            if parquet_writer:
+                parquet_writer.close()
+
+        return total
+
+    def export_streaming(self, output_dir='exports', chunk_size=10000, formats=('csv', 'parquet')):
+        """Export both databases chunk by chunk so memory stays constant regardless of table size"""
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        pg_base = f"{output_dir}/postgres_jobs_{timestamp}"
+        if tuple(formats) == ('csv',):
+            self.copy_postgres_csv(f"{pg_base}.csv")
+            print(f"PostgreSQL data exported to {pg_base}.csv")
+        else:
+            total = self.write_chunks(self.stream_postgres_data(chunk_size), pg_base, POSTGRES_PARQUET_SCHEMA, formats)
+            print(f"PostgreSQL data exported to {pg_base} ({', '.join(formats)})")
+            print(f"Total PostgreSQL records: {total}")
+
+        if self.mongodb_settings:
+            mongo_base = f"{output_dir}/mongodb_jobs_{timestamp}"
+            total = self.write_chunks(self.stream_mongodb_data(chunk_size), mongo_base, MONGODB_PARQUET_SCHEMA, formats)
+            print(f"MongoDB data exported to {mongo_base} ({', '.join(formats)})")
+            print(f"Total MongoDB records: {total}")
+
+    def export_postgres_shard(self, id_range, part_base, chunk_size, formats):
+        """Export one _id range on a pooled connection of its own; returns the row count, if known"""
+        conn = self.get_engine().raw_connection()
+        try:
+            if tuple(formats) == ('csv',):
+                self.copy_postgres_csv(f"{part_base}.csv", id_range, conn)
+                return None
+            chunks = self.stream_postgres_data(chunk_size, id_range=id_range, conn=conn)
+            return self.write_chunks(chunks, part_base, POSTGRES_PARQUET_SCHEMA, formats, header=False)
+        finally:
+            # Hands the connection back to the pool
+            conn.close()
+
+    def export_mongodb_shard(self, id_range, part_base, chunk_size, formats):
+        chunks = self.stream_mongodb_data(chunk_size, id_range=id_range)
+        return self.write_chunks(chunks, part_base, MONGODB_PARQUET_SCHEMA, formats, header=False)
+
+    def export_parallel(self, output_dir='exports', chunk_size=10000, formats=('csv', 'parquet'), shards=8, workers=8):
+        """Export both databases at once, each split into _id-range shards run side by side.
+
+        Shards of PostgreSQL and MongoDB share one thread pool and are written
+        to hidden part files, which are concatenated in key order into the
+        same files export_streaming writes. Rows come out grouped by shard
+        rather than sorted by correctDate.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        ranges = id_ranges(shards)
+
+        # Create the engine before the shards start so they share one pool
+        self.get_engine()
+        sources = [('PostgreSQL', 'postgres', POSTGRES_PARQUET_SCHEMA, self.export_postgres_shard)]
+        if self.mongodb_settings:
+            # Connect before the shards start so they share one client
+            if not self.mongo_client:
+                self.connect_mongodb()
+            if self.mongo_client:
+                sources.append(('MongoDB', 'mongodb', MONGODB_PARQUET_SCHEMA, self.export_mongodb_shard))
+
+        parts = []
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                running = []
+                for name, prefix, schema, export_shard in sources:
+                    base = f"{output_dir}/{prefix}_jobs_{timestamp}"
+                    part_bases = [f"{output_dir}/.{prefix}_jobs_{timestamp}.part{index:04d}" for index in range(shards)]
+                    parts.extend(part_bases)
+                    running.append((name, base, schema, export_shard, part_bases, []))
+                # Alternate between the sources so both databases are read from the start
+                for index, id_range in enumerate(ranges):
+                    for name, base, schema, export_shard, part_bases, futures in running:
+                        futures.append(pool.submit(export_shard, id_range, part_bases[index], chunk_size, formats))
+
+                # The first source is concatenated while the other's shards are still running
+                for name, base, schema, export_shard, part_bases, futures in running:
+                    counts = [future.result() for future in futures]
+                    concat_parts(part_bases, base, schema, formats)
+                    print(f"{name} data exported to {base} ({', '.join(formats)}) from {shards} shards")
+                    if None not in counts:
+                        print(f"Total {name} records: {sum(counts)}")
+        finally:
+            # Parts of a failed export are left behind only until here
+            for part_base in parts:
+                for extension in ('csv', 'parquet'):
+                    if os.path.exists(f"{part_base}.{extension}"):
+                        os.remove(f"{part_base}.{extension}")
+
+    def load_watermarks(self, output_dir):
+        path = os.path.join(output_dir, WATERMARK_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return {source: datetime.fromisoformat(value) for source, value in json.load(f).items()}
+
+    def save_watermarks(self, output_dir, watermarks):
+        path = os.path.join(output_dir, WATERMARK_FILE)
+        # Write then rename so a crash never leaves a truncated watermark file
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump({source: value.isoformat() for source, value in watermarks.items()}, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def export_incremental(self, output_dir='exports', chunk_size=10000, formats=('csv', 'parquet'), lag_seconds=60):
+        """Export only rows added or changed since the previous incremental run"""
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        watermarks = self.load_watermarks(output_dir)
+
+        if not self.pg_conn:
+            self.connect_postgres()
+
+        # Rows stamped within the lag window may belong to writes that are still
+        # committing, so the upper bound trails the clock and they go out next run
+        with self.pg_conn.cursor() as cur:
+            cur.execute("SELECT now() - make_interval(secs => %s)", (lag_seconds,))
+            pg_until = cur.fetchone()[0]
+        self.pg_conn.commit()
+
+        pg_base = f"{output_dir}/postgres_jobs_incremental_{timestamp}"
+        chunks = self.stream_postgres_data(chunk_size, watermarks.get('postgres'), pg_until)
+        total = self.write_chunks(chunks, pg_base, POSTGRES_PARQUET_SCHEMA, formats)
+        print(f"PostgreSQL changes since {watermarks.get('postgres')} exported to {pg_base} ({', '.join(formats)})")
+        print(f"Total PostgreSQL records: {total}")
+        watermarks['postgres'] = pg_until
+        self.save_watermarks(output_dir, watermarks)
+
+        if not self.mongo_client and self.mongodb_settings:
+            self.connect_mongodb()
+        if self.mongo_client:
+            mongo_until = datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+            mongo_base = f"{output_dir}/mongodb_jobs_incremental_{timestamp}"
+            chunks = self.stream_mongodb_data(chunk_size, watermarks.get('mongodb'), mongo_until)
+            total = self.write_chunks(chunks, mongo_base, MONGODB_PARQUET_SCHEMA, formats)
+            print(f"MongoDB changes since {watermarks.get('mongodb')} exported to {mongo_base} ({', '.join(formats)})")
+            print(f"Total MongoDB records: {total}")
+            watermarks['mongodb'] = mongo_until
+            self.save_watermarks(output_dir, watermarks)
+
     def close_connections(self):
         if self.pg_conn:
             self.pg_conn.close()
             print("PostgreSQL connection closed")
+
+        if self.engine is not None:
+            self.engine.dispose()
             
         if self.mongo_client:
             self.mongo_client.close()
             print("MongoDB connection closed")
 
+def lookup_jobs(job_ids, postgres_settings, redis_settings):
+    """Print jobs by _id through the Redis cache, falling back to PostgreSQL"""
+    postgres_connector = PostgresConnector(
+        dbname=postgres_settings['database'],
+        user=postgres_settings['user'],
+        password=postgres_settings['password'],
+        host=postgres_settings['host'],
+        port=postgres_settings['port']
+    )
+    redis_connector = RedisConnector(host=redis_settings['host'], port=redis_settings['port'], db=redis_settings['db'])
+    try:
+        cache = JobCache(redis_connector, postgres_connector)
+        jobs = cache.get_many(job_ids)
+        for job_id in job_ids:
+            print(json.dumps(jobs.get(job_id) or {'_id': job_id, 'found': False}))
+        print(f"Cache stats: {cache.stats()}")
+    finally:
+        postgres_connector.close_all()
+        redis_connector.get_client().close()
+
 if __name__ == "__main__":
     # Settings from settings.py
     postgres_settings = {
@@ -153,14 +550,50 @@ if __name__ == "__main__":
         'password': 'example',
         'database': 'jobs_db'
     }
+
+    redis_settings = {
+        'host': 'redis',
+        'port': 6379,
+        'db': 0
+    }
     
-    try:
-        # Initialize query object
-        db_query = DatabaseQuery(postgres_settings, mongodb_settings)
+    parser = argparse.ArgumentParser(description='Export jobs from PostgreSQL and MongoDB')
+    parser.add_argument('--output-dir', default='exports')
+    parser.add_argument('--stream', action='store_true',
+                        help='Export in constant memory with server-side cursors')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Stream only rows added or changed since the last incremental export')
+    parser.add_argument('--lag-seconds', type=int, default=60,
+                        help='Leave rows updated this recently for the next incremental run')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Export both databases at once, each in _id-range shards on a thread pool')
+    parser.add_argument('--shards', type=int, default=8, help='Key-range shards per database for --parallel')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Threads for --parallel, shared by both databases; also the PostgreSQL pool size')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--format', dest='formats', action='append', choices=['csv', 'parquet'],
+                        help='Streaming output format (repeatable, default: csv and parquet)')
+    parser.add_argument('--lookup', action='append', metavar='JOB_ID',
+                        help='Print a job by _id via the Redis cache instead of exporting (repeatable)')
+    args = parser.parse_args()
+
+    if args.lookup:
+        lookup_jobs(args.lookup, postgres_settings, redis_settings)
+    else:
+        try:
+            # Initialize query object
+            db_query = DatabaseQuery(postgres_settings, mongodb_settings, pool_size=args.workers)
         
-        # Export data to CSV
-        db_query.export_to_csv()
+            if args.incremental:
+                db_query.export_incremental(args.output_dir, args.chunk_size, args.formats or ('csv', 'parquet'), args.lag_seconds)
+            elif args.parallel:
+                db_query.export_parallel(args.output_dir, args.chunk_size, args.formats or ('csv', 'parquet'), args.shards, args.workers)
+            elif args.stream:
+                db_query.export_streaming(args.output_dir, args.chunk_size, args.formats or ('csv', 'parquet'))
+            else:
+                # Export data to CSV
+                db_query.export_to_csv(args.output_dir)
         
-    finally:
-        # Ensure connections are closed
-        db_query.close_connections()
+        finally:
+            # Ensure connections are closed
+            db_query.close_connections()
@@ -0,0 +1,115 @@
+"""Re-feed dead-lettered items through the stage that failed them.
+
+    python replay.py
+    python replay.py --file /app/logs/dead_letters.jsonl.gz --batch-size 1000 --stage flush.PostgresPipeline
+
+The file is moved aside before replaying, so items that fail again are written
+to a fresh dead-letter file instead of being read back in the same run.
+"""
+import argparse
+import itertools
+import logging
+import os
+import time
+
+from jobs_project import settings
+from jobs_project.deadletter import dead_letters, read_dead_letters
+from jobs_project.items import JobItem
+from jobs_project.pipelines import MongoDBPipeline, PostgresPipeline, RedisPipeline
+from jobs_project.spiders.json_spider import JsonSpider
+
+# Pipeline classes by the name used in dead-letter stages, with their settings
+STORAGE_PIPELINES = {
+    'PostgresPipeline': (PostgresPipeline, 'POSTGRES_SETTINGS'),
+    'RedisPipeline': (RedisPipeline, 'REDIS_SETTINGS'),
+    'MongoDBPipeline': (MongoDBPipeline, 'MONGODB_SETTINGS'),
+}
+
+class Replayer:
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.spider = JsonSpider()
+        self.pipelines = {}
+        self.replayed = {}
+
+    def pipeline(self, name):
+        """Open each pipeline on first use, batching writes at the replay batch size"""
+        if name not in self.pipelines:
+            pipeline_class, settings_name = STORAGE_PIPELINES[name]
+            pipeline = pipeline_class({**getattr(settings, settings_name), 'batch_size': self.batch_size})
+            pipeline.open_spider(self.spider)
+            self.pipelines[name] = pipeline
+        return self.pipelines[name]
+
+    def replay(self, record):
+        stage = record['stage']
+        if stage.startswith('spider.'):
+            # The raw job never became an item; rebuild it and store it everywhere
+            items = self.spider.parse_jobs([record['item']], record.get('filename'))
+            names = list(STORAGE_PIPELINES)
+        else:
+            items = [JobItem(**record['item'])]
+            names = [stage.split('.', 1)[1]]
+
+        for item in items:
+            for name in names:
+                item = self.pipeline(name).process_item(item, self.spider)
+        self.replayed[stage] = self.replayed.get(stage, 0) + 1
+
+    def close(self):
+        for pipeline in self.pipelines.values():
+            pipeline.close_spider(self.spider)
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay dead-lettered items through the pipelines')
+    parser.add_argument('--file', default=settings.DEAD_LETTER_FILE)
+    parser.add_argument('--batch-size', type=int, default=1000, help='Items per batched write')
+    parser.add_argument('--stage', action='append',
+                        help='Only replay records from this stage (repeatable), e.g. flush.PostgresPipeline')
+    parser.add_argument('--keep', action='store_true', help='Keep the replayed file instead of deleting it')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=settings.LOG_FORMAT, datefmt=settings.LOG_DATEFORMAT)
+    logger = logging.getLogger('replay')
+
+    if not args.file or not os.path.exists(args.file):
+        logger.info(f"No dead-letter file at {args.file}, nothing to replay")
+        return
+
+    claimed = f"{args.file}.{time.strftime('%Y%m%d%H%M%S')}.replay"
+    os.replace(args.file, claimed)
+    dead_letters.configure(args.file)
+
+    replayer = Replayer(args.batch_size)
+    skipped = 0
+    try:
+        records = read_dead_letters(claimed)
+        for batch in iter(lambda: list(itertools.islice(records, args.batch_size)), []):
+            for record in batch:
+                if args.stage and record['stage'] not in args.stage:
+                    # Written back so a later replay can still pick it up
+                    dead_letters.record(record['stage'], record['item'], record['error'],
+                                        **({'filename': record['filename']} if 'filename' in record else {}))
+                    skipped += 1
+                    continue
+                replayer.replay(record)
+            logger.info(f"Replayed {sum(replayer.replayed.values())} items")
+    finally:
+        replayer.close()
+        dead_letters.close()
+
+    for stage, count in sorted(replayer.replayed.items()):
+        logger.info(f"{stage}: {count} items replayed")
+    if skipped:
+        logger.info(f"{skipped} items from other stages kept for a later replay")
+    failed = sum(dead_letters.counts.values()) - skipped
+    if failed:
+        logger.warning(f"{failed} items failed again and were written to {args.file}")
+
+    if args.keep:
+        logger.info(f"Replayed records kept in {claimed}")
+    else:
+        os.remove(claimed)
+
+if __name__ == "__main__":
+    main()